@@ -1,14 +1,13 @@
+import io
+import os
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-
-from src.parser import parse_transcript, get_quick_stats
-from src.advisor import (
-    generate_project_ideas,
-    generate_career_pathways,
-    identify_skill_gaps,
-    analyze_strengths_weaknesses,
-)
+
+# plotly and the advisor stack (cohere, dotenv) are imported where they are
+# first needed, so the landing page renders without loading them
+from src.parser import content_hash, parse_transcript, get_quick_stats
+from src.cache import BucketConfig, ProfileBucketCache
+from src.store import TranscriptHandle, TranscriptStore
 
 # -------------------------------------------------------------------
 # Page config
@@ -495,13 +494,236 @@ st.markdown(HEADER_HTML, unsafe_allow_html=True)
 # -------------------------------------------------------------------
 # Session state
 # -------------------------------------------------------------------
-if "df" not in st.session_state:
-    st.session_state["df"] = None
-if "student_info" not in st.session_state:
-    st.session_state["student_info"] = None
+if "transcript" not in st.session_state:
+    st.session_state["transcript"] = None
+if "report" not in st.session_state:
+    st.session_state["report"] = {}
+if "prefetch" not in st.session_state:
+    st.session_state["prefetch"] = None
+if "cohort" not in st.session_state:
+    st.session_state["cohort"] = None
+
+# -------------------------------------------------------------------
+# Shared advisor cache (opt-in via ADVISOR_PROFILE_CACHE=1)
+# -------------------------------------------------------------------
+@st.cache_resource
+def get_profile_cache():
+    if os.getenv("ADVISOR_PROFILE_CACHE", "").lower() not in ("1", "true", "yes"):
+        return None
+    config = BucketConfig(
+        gpa_step=float(os.getenv("ADVISOR_CACHE_GPA_STEP", "0.5")),
+        subject_count=int(os.getenv("ADVISOR_CACHE_SUBJECTS", "3")),
+        variants=int(os.getenv("ADVISOR_CACHE_VARIANTS", "3")),
+    )
+    return ProfileBucketCache(config)
+
+
+profile_cache = get_profile_cache()
+
+
+# -------------------------------------------------------------------
+# Parsed transcripts, shared across sessions and keyed on file content.
+# Sessions hold a handle; the DataFrame itself exists once per process.
+# -------------------------------------------------------------------
+@st.cache_resource
+def get_transcript_store():
+    max_mb = os.getenv("PARSE_CACHE_MB")
+    return TranscriptStore(
+        max_entries=int(os.getenv("PARSE_CACHE_ENTRIES", "128")),
+        max_bytes=int(float(max_mb) * 2**20) if max_mb else None,
+    )
+
+
+def load_transcript(digest: str, data: bytes) -> TranscriptHandle:
+    return get_transcript_store().acquire(digest, lambda: parse_transcript(io.BytesIO(data)))
+
+
+# -------------------------------------------------------------------
+# Background advisor outputs (opt-in)
+# -------------------------------------------------------------------
+PREFETCH_DEFAULT = os.getenv("ADVISOR_PREFETCH", "").lower() in ("1", "true", "yes")
+
+
+@st.fragment(run_every=2)
+def wait_for_prefetch(key: str):
+    if st.session_state["prefetch"][key].done():
+        st.rerun()
+    st.caption("⏳ Preparing this in the background — it will appear here when ready.")
+
+
+def render_section(key: str):
+    """Show a stored advisor output, or attach to the background job producing it."""
+    report = st.session_state["report"]
+    if key in report:
+        st.markdown(report[key])
+        return
+    future = (st.session_state["prefetch"] or {}).get(key)
+    if future is None:
+        return
+    if not future.done():
+        wait_for_prefetch(key)
+    elif future.exception() is not None:
+        st.error(f"Error: {future.exception()}")
+    else:
+        report[key] = future.result()
+        st.markdown(report[key])
+
+
+def parse_cohort(files, digests):
+    """Parse a batch of (name, bytes) uploads in a worker pool with live progress."""
+    from src.batch import cohort_frame, parse_many
+
+    progress = st.progress(0.0, text=f"Parsing 0 of {len(files)} transcripts…")
+    with st.status(f"Parsing {len(files)} transcripts…", expanded=False) as status:
+
+        def on_progress(done, total, result):
+            progress.progress(done / total, text=f"Parsing {done} of {total} transcripts…")
+            if result.ok:
+                st.write(f"✅ {result.name}")
+            else:
+                st.write(f"❌ {result.name}: {result.error}")
+
+        results = parse_many(files, on_progress=on_progress, digests=digests)
+        failed = sum(not r.ok for r in results)
+        status.update(
+            label=f"Parsed {len(results) - failed} of {len(results)} transcripts",
+            state="error" if failed == len(results) else "complete",
+        )
+    progress.empty()
+    cohort_df = cohort_frame(results)
+    return {"results": results, "df": cohort_df, "aggregates": cohort_aggregates(results, cohort_df)}
+
+
+def cohort_aggregates(results, cohort_df):
+    """Everything the cohort view shows, aggregated once per upload on the server."""
+    from src.analyzer import course_stats, gpa_by_year, grade_distribution
+    from src.batch import cohort_summary
+
+    summary = cohort_summary(results)
+    if cohort_df.empty:
+        return {"summary": summary, "rows": 0}
+    return {
+        "summary": summary,
+        "rows": len(cohort_df),
+        "grades": grade_distribution(cohort_df),
+        "years": gpa_by_year(cohort_df),
+        "courses": course_stats(cohort_df),
+    }
+
+
+def paged_table(table, key: str, page_size: int = 50):
+    """Send one page of a large table to the browser instead of all of it."""
+    from src.analyzer import paginate
+
+    pages = max(1, -(-len(table) // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", 1, pages, 1, key=f"{key}_page")
+    rows, _ = paginate(table, page, page_size)
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    st.caption(f"{len(table)} rows · page {page} of {pages}")
+
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv", "csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", "parquet"),
+    "Arrow": ("arrow", "application/vnd.apache.arrow.file", "arrow"),
+}
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def export_file(export_id: str, fmt: str, _parts):
+    from src.export import write_csv, write_ipc, write_parquet
+
+    buf = io.BytesIO()
+    {"csv": write_csv, "parquet": write_parquet, "arrow": write_ipc}[fmt](_parts, buf)
+    return buf.getvalue()
+
+
+def export_buttons(export_id: str, parts, file_stem: str):
+    """Download buttons for course records in every export format."""
+    columns = st.columns(len(EXPORT_FORMATS))
+    for column, (label, (fmt, mime, ext)) in zip(columns, EXPORT_FORMATS.items()):
+        with column:
+            try:
+                data = export_file(export_id, fmt, parts)
+            except ImportError as e:
+                st.caption(f"{label} export unavailable: {e}")
+                continue
+            st.download_button(
+                f"⬇️ {label}",
+                data=data,
+                file_name=f"{file_stem}.{ext}",
+                mime=mime,
+                key=f"export_{export_id}_{fmt}",
+                use_container_width=True,
+            )
+
+
+def render_cohort_view(cohort):
+    import plotly.express as px
+
+    agg = cohort["aggregates"]
+    summary = agg["summary"]
+    ok = summary[summary["Status"] == "ok"]
+
+    st.markdown(
+        """
+<div class="section-title-row" style="margin-top: 1.5rem;">
+<div class="section-title">Cohort overview</div>
+<div class="section-subtitle">Combined from every transcript you uploaded.</div>
+</div>
+""",
+        unsafe_allow_html=True,
+    )
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        st.metric("Transcripts", len(summary))
+    with c2:
+        st.metric("Parsed", len(ok))
+    with c3:
+        st.metric("Total Courses", agg["rows"])
+    with c4:
+        st.metric("Mean GPA", round(ok["GPA"].mean(), 2) if len(ok) else "N/A")
+
+    if agg["rows"]:
+        st.markdown("---")
+        col_left, col_right = st.columns(2)
+
+        with col_left:
+            st.subheader("Grade distribution")
+            fig = px.bar(agg["grades"], x="Grade", y="Count", title="Grades across the cohort")
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col_right:
+            st.subheader("GPA by year")
+            fig = px.line(
+                agg["years"],
+                x="Year",
+                y="GPA",
+                markers=True,
+                hover_data=["Mean_Grade_Point", "Students"],
+                title="Cohort GPA progression",
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("Courses")
+        sort_by = st.selectbox(
+            "Sort courses by",
+            ["Below_C_Rate", "Mean_Grade_Point", "Students", "Course_Code"],
+            key="cohort_course_sort",
+        )
+        courses = agg["courses"].sort_values(sort_by, ascending=sort_by in ("Mean_Grade_Point", "Course_Code"))
+        paged_table(courses, "cohort_courses")
+
+    st.subheader("Students")
+    paged_table(summary, "cohort_students")
+
+    st.subheader("Export course records")
+    parts = [(r.df, r.student_info) for r in cohort["results"] if r.ok]
+    export_id = content_hash("".join(sorted(r.digest for r in cohort["results"] if r.ok)).encode())
+    export_buttons(export_id, parts, "cohort_transcripts")
 
-df = st.session_state["df"]
-student_info = st.session_state["student_info"]
 
 # -------------------------------------------------------------------
 # Main content container
@@ -525,36 +747,67 @@ Drop in your official PDF transcript. We’ll parse it automatically and build y
 </div>
 """
         st.markdown(UPLOAD_COPY, unsafe_allow_html=True)
+        cohort_mode = st.toggle(
+            "Cohort mode",
+            key="cohort_mode",
+            help="Upload many transcripts at once and see them side by side",
+        )
 
     with right:
-        uploaded_file = st.file_uploader(
-            "Choose your transcript (PDF)",
-            type=["pdf"],
-            label_visibility="collapsed",
-            key="transcript_uploader",
-        )
+        if cohort_mode:
+            uploaded_files = st.file_uploader(
+                "Choose transcripts (PDF)",
+                type=["pdf"],
+                accept_multiple_files=True,
+                label_visibility="collapsed",
+                key="cohort_uploader",
+            )
+            if uploaded_files:
+                files = [(f.name, f.getvalue()) for f in uploaded_files]
+                digests = [content_hash(data) for _, data in files]
+                # Keyed on content, so a re-upload with the same names and sizes is not mistaken for this one
+                cohort_id = tuple(sorted(zip(digests, (name for name, _ in files))))
+                cohort = st.session_state["cohort"]
+                if cohort is None or cohort["id"] != cohort_id:
+                    cohort = parse_cohort(files, digests)
+                    cohort["id"] = cohort_id
+                    st.session_state["cohort"] = cohort
+        else:
+            uploaded_file = st.file_uploader(
+                "Choose your transcript (PDF)",
+                type=["pdf"],
+                label_visibility="collapsed",
+                key="transcript_uploader",
+            )
 
-        if uploaded_file is not None:
-            with st.spinner("Parsing transcript…"):
-                try:
-                    with open("temp_transcript.pdf", "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    df, student_info = parse_transcript("temp_transcript.pdf")
-                    st.session_state["df"] = df
-                    st.session_state["student_info"] = student_info
+            if uploaded_file is not None:
+                data = uploaded_file.getvalue()
+                upload_id = content_hash(data)
+                if st.session_state.get("upload_id") != upload_id:
+                    with st.spinner("Parsing transcript…"):
+                        try:
+                            handle = load_transcript(upload_id, data)
+                            if st.session_state["transcript"] is not None:
+                                st.session_state["transcript"].release()
+                            st.session_state["upload_id"] = upload_id
+                            st.session_state["report"] = {}
+                            st.session_state["prefetch"] = None
+                            st.session_state["transcript"] = handle
+                        except Exception as e:
+                            st.error(f"Error parsing transcript: {e}")
+                if st.session_state.get("upload_id") == upload_id:
                     st.success("✅ Transcript parsed successfully")
-                except Exception as e:
-                    st.error(f"Error parsing transcript: {e}")
 
     st.markdown("</div></div>", unsafe_allow_html=True)
 
-df = st.session_state["df"]
-student_info = st.session_state["student_info"]
+transcript = st.session_state["transcript"]
+df = transcript.df if transcript is not None else None
+student_info = transcript.student_info if transcript is not None else None
 
 # -------------------------------------------------------------------
 # Quick snapshot under upload (if transcript loaded)
 # -------------------------------------------------------------------
-if df is not None:
+if df is not None and not cohort_mode:
     stats = get_quick_stats(df)
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -564,10 +817,19 @@ if df is not None:
     with c3:
         st.metric("Total Credits", stats["total_credits"])
 
+# -------------------------------------------------------------------
+# Cohort state (many transcripts parsed)
+# -------------------------------------------------------------------
+if cohort_mode:
+    if st.session_state["cohort"] is not None:
+        render_cohort_view(st.session_state["cohort"])
+    else:
+        st.info("📎 Drop a batch of transcript PDFs above to build a cohort view.")
+
 # -------------------------------------------------------------------
 # Empty state (no transcript yet)
 # -------------------------------------------------------------------
-if df is None:
+elif df is None:
     HERO_HTML = """
 <div class="hero">
 <div class="hero-left">
@@ -665,6 +927,22 @@ to close the gap.
 # Loaded state (transcript parsed)
 # -------------------------------------------------------------------
 else:
+    import pandas as pd
+    import plotly.express as px
+
+    from src.advisor import (
+        REPORT_SECTIONS,
+        generate_project_ideas,
+        generate_career_pathways,
+        generate_full_report,
+        stream_section,
+    )
+    from src.insights import compute_insights, insights_markdown
+    from src.neighbors import get_neighbor_index
+
+    # Rule-based facts shown above the AI narrative in the skill gaps tab
+    GAP_INSIGHTS = ("standing", "worst", "weak_areas", "failed")
+
     TITLE_HTML = """
 <div class="section-title-row" style="margin-top: 1.5rem;">
 <div class="section-title">Student overview</div>
@@ -685,6 +963,59 @@ else:
 
     st.markdown("---")
 
+    st.toggle(
+        "Prepare AI sections in the background",
+        value=PREFETCH_DEFAULT,
+        key="prefetch_enabled",
+        help="Starts all four AI sections as soon as your transcript is parsed",
+    )
+
+    # Sections that depend on a setting are stale once it changes: drop their
+    # stored output and background job so they are generated again
+    advice_inputs = {
+        "project_ideas": st.session_state.get("num_ideas", 5),
+        "skill_gaps": (st.session_state.get("target_role") or "").strip(),
+    }
+    previous = st.session_state.get("advice_inputs") or advice_inputs
+    for key, value in advice_inputs.items():
+        if previous.get(key) != value:
+            st.session_state["report"].pop(key, None)
+            (st.session_state["prefetch"] or {}).pop(key, None)
+    st.session_state["advice_inputs"] = advice_inputs
+
+    if st.session_state["prefetch_enabled"]:
+        from src.prefetch import start_prefetch
+
+        prefetch = st.session_state["prefetch"] or {}
+        missing = [k for k in REPORT_SECTIONS if k not in prefetch and k not in st.session_state["report"]]
+        if missing:
+            prefetch.update(start_prefetch(
+                df,
+                student_info,
+                num_ideas=advice_inputs["project_ideas"],
+                target_role=advice_inputs["skill_gaps"],
+                cache=profile_cache,
+                combined=os.getenv("ADVISOR_PREFETCH_COMBINED", "").lower() in ("1", "true", "yes"),
+                sections=missing,
+            ))
+            st.session_state["prefetch"] = prefetch
+
+    if st.button("Generate full advisory report", help="All four AI sections in a single request"):
+        with st.spinner("Preparing your full advisory report…"):
+            try:
+                st.session_state["report"] = generate_full_report(
+                    df,
+                    student_info,
+                    num_ideas=st.session_state.get("num_ideas", 5),
+                    target_role=(st.session_state.get("target_role") or "").strip(),
+                    cache=profile_cache,
+                )
+            except Exception as e:
+                st.error(f"Error: {e}")
+
+    report = st.session_state["report"]
+    insights = compute_insights(df)
+
     tab1, tab2, tab3, tab4, tab5 = st.tabs(
         [
             "📊 Performance Overview",
@@ -741,6 +1072,33 @@ else:
             else:
                 st.info("Year information not available in your transcript.")
 
+        neighbor_index = get_neighbor_index()
+        if neighbor_index is not None and len(neighbor_index):
+            st.subheader("Students with similar profiles")
+            outlook = neighbor_index.outlook(df, k=20, exclude=student_info.get("Matric_No"))
+            if outlook["neighbors"]:
+                st.caption(
+                    f"The {len(outlook['neighbors'])} most similar students in the cohort "
+                    f"finished with an average GPA of {outlook['mean_gpa']}."
+                )
+                n1, n2 = st.columns(2)
+                with n1:
+                    st.markdown("**Courses ahead they did well in**")
+                    st.dataframe(
+                        pd.DataFrame(outlook["strong_ahead"], columns=["Course_Code", "Mean_Grade_Point"]),
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+                with n2:
+                    st.markdown("**Courses ahead they found hardest**")
+                    st.dataframe(
+                        pd.DataFrame(outlook["weak_ahead"], columns=["Course_Code", "Mean_Grade_Point"]),
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+            else:
+                st.info("No students with overlapping courses in the cohort index yet.")
+
         st.subheader("All courses")
         st.dataframe(
             df[
@@ -756,18 +1114,25 @@ else:
             use_container_width=True,
         )
 
+        st.subheader("Export")
+        file_stem = (student_info.get("Matric_No") or "transcript").replace("/", "_")
+        export_buttons(st.session_state["upload_id"], [(df, student_info)], file_stem)
+
     # AI Project Ideas tab
     with tab2:
         st.subheader("AI-generated project ideas")
-        num_ideas = st.slider("Number of project ideas", 3, 10, 5)
+        num_ideas = st.slider("Number of project ideas", 3, 10, 5, key="num_ideas")
 
         if st.button("Generate project ideas", type="primary"):
             with st.spinner("Analyzing your transcript and generating ideas…"):
                 try:
-                    ideas = generate_project_ideas(df, student_info, num_ideas)
+                    ideas = generate_project_ideas(df, student_info, num_ideas, cache=profile_cache)
+                    report["project_ideas"] = ideas
                     st.markdown(ideas)
                 except Exception as e:
                     st.error(f"Error: {e}")
+        else:
+            render_section("project_ideas")
 
     # Career Pathways tab
     with tab3:
@@ -776,10 +1141,13 @@ else:
         if st.button("Generate career pathways", type="primary"):
             with st.spinner("Analyzing potential career fits…"):
                 try:
-                    careers = generate_career_pathways(df, student_info)
+                    careers = generate_career_pathways(df, student_info, cache=profile_cache)
+                    report["career_pathways"] = careers
                     st.markdown(careers)
                 except Exception as e:
                     st.error(f"Error: {e}")
+        else:
+            render_section("career_pathways")
 
     # Skill Gaps tab
     with tab4:
@@ -787,28 +1155,38 @@ else:
         target_role = st.text_input(
             "Target role (optional)",
             placeholder="e.g., Software Engineer, Data Analyst",
+            key="target_role",
         )
 
+        # Facts from the transcript itself render at once; the AI narrative follows
+        st.markdown(insights_markdown([i for i in insights if i.kind in GAP_INSIGHTS]))
+
         if st.button("Identify skill gaps", type="primary"):
-            with st.spinner("Comparing your profile to the target role…"):
-                try:
-                    role_for_analysis = target_role.strip() if target_role else ""
-                    gaps = identify_skill_gaps(df, student_info, role_for_analysis)
-                    st.markdown(gaps)
-                except Exception as e:
-                    st.error(f"Error: {e}")
+            try:
+                role_for_analysis = target_role.strip() if target_role else ""
+                report["skill_gaps"] = st.write_stream(
+                    stream_section("skill_gaps", df, student_info, target_role=role_for_analysis, cache=profile_cache)
+                )
+            except Exception as e:
+                st.error(f"Error: {e}")
+        else:
+            render_section("skill_gaps")
 
     # Detailed Analysis tab
     with tab5:
         st.subheader("Detailed performance analysis")
 
+        st.markdown(insights_markdown(insights))
+
         if st.button("Generate detailed analysis", type="primary"):
-            with st.spinner("Analyzing your strengths and weaknesses…"):
-                try:
-                    analysis = analyze_strengths_weaknesses(df, student_info)
-                    st.markdown(analysis)
-                except Exception as e:
-                    st.error(f"Error: {e}")
+            try:
+                report["detailed_analysis"] = st.write_stream(
+                    stream_section("detailed_analysis", df, student_info, cache=profile_cache)
+                )
+            except Exception as e:
+                st.error(f"Error: {e}")
+        else:
+            render_section("detailed_analysis")
 
 # -------------------------------------------------------------------
 # Footer
@@ -1,58 +1,66 @@
 from __future__ import annotations
-import os
-import cohere
-import pandas as pd
-from typing import Dict
-from dotenv import load_dotenv
+import json
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Tuple
 
-# Load environment variables
-load_dotenv()
+from src.analyzer import overall_gpa, top_course_groups
+from src.backends import get_backend
+from src.cache import ProfileBucketCache
+from src.resilience import call_label, latency_stats
+from src.singleflight import advisor_flight, prompt_key
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def get_cohere_client():
-    """Initialize Cohere client."""
-    api_key = os.getenv('COHERE_API_KEY')
-    if not api_key:
-        raise ValueError(
-            "COHERE_API_KEY not found in .env file.\n"
-            "Get a free API key at: https://dashboard.cohere.com"
-        )
-    return cohere.Client(api_key)
 
+def _chat(prompt: str, kind: str = "other") -> str:
+    """Send one prompt to the configured LLM backend and return the response text."""
+    def call() -> str:
+        with call_label(kind):
+            return get_backend().chat(prompt, temperature=0.7)
 
-def generate_project_ideas(df: pd.DataFrame, student_info: Dict, num_ideas: int = 5) -> str:
-    """
-    Generate personalized final year project ideas based on transcript.
-    
-    Args:
-        df: DataFrame with course information
-        student_info: Dictionary with student details
-        num_ideas: Number of project ideas to generate
-        
-    Returns:
-        String with AI-generated project ideas
-    """
-    co = get_cohere_client()
-    
+    # Identical prompts from concurrent sessions share one upstream call
+    return advisor_flight.do(prompt_key(prompt, 0.7), call)
+
+
+def llm_stats() -> Dict:
+    """Latency histograms per advisor function, breaker state and coalescing counts."""
+    return {**latency_stats(get_backend()), "single_flight": advisor_flight.stats()}
+
+
+def _respond(
+    kind: str,
+    prompt: str,
+    df: pd.DataFrame,
+    student_info: Dict,
+    cache: ProfileBucketCache | None = None,
+    extra: tuple = (),
+) -> str:
+    """Answer a prompt, going through the profile-bucket cache when one is given."""
+    if cache is None:
+        return _chat(prompt, kind)
+    key = cache.bucket_key(kind, df, student_info, extra)
+    return cache.get_or_generate(key, lambda: _chat(prompt, kind))
+
+
+def _project_ideas_prompt(df: pd.DataFrame, student_info: Dict, num_ideas: int) -> str:
+    """Build the project ideas prompt."""
     # Analyze student's strengths
     strong_courses = df[df['Grade_Point'] >= 4.0]['Course_Title'].tolist()
     weak_courses = df[df['Grade_Point'] < 3.0]['Course_Title'].tolist()
     
-    # Get subject areas (first 3 letters of course code)
-    df_copy = df.copy()
-    df_copy['Subject_Area'] = df_copy['Course_Code'].str[:3]
-    strong_subjects = df_copy[df_copy['Grade_Point'] >= 4.0].groupby('Subject_Area').size().sort_values(ascending=False).head(3).index.tolist()
+    # Groups of related strong courses, across course-code prefixes
+    strong_subjects = top_course_groups(df, strong=True)
     
     # Calculate GPA
-    overall_gpa = round(df['Credit_Value'].sum() / df['Credit_Unit'].sum(), 2)
+    gpa = overall_gpa(df)
     
     department = student_info.get('Department', 'Unknown')
     
-    prompt = f"""You are an experienced academic advisor at University of Lagos (UNILAG), Nigeria.
+    return f"""You are an experienced academic advisor at University of Lagos (UNILAG), Nigeria.
 
 STUDENT PROFILE:
 - Department: {department}
-- Overall GPA: {overall_gpa}/5.0
+- Overall GPA: {gpa}/5.0
 - Strong subject areas: {', '.join(strong_subjects)}
 - Excellent performance in: {', '.join(strong_courses[:5])}
 - Struggled with: {', '.join(weak_courses[:3]) if weak_courses else 'No major challenges'}
@@ -75,41 +83,41 @@ For each project idea, provide:
 
 Format as a numbered list with clear headings."""
 
-    response = co.chat(
-        model="command-a-03-2025",
-        message=prompt,
-        temperature=0.7,
-    )
-    
-    return response.text
 
-
-def generate_career_pathways(df: pd.DataFrame, student_info: Dict) -> str:
+def generate_project_ideas(
+    df: pd.DataFrame,
+    student_info: Dict,
+    num_ideas: int = 5,
+    cache: ProfileBucketCache | None = None,
+) -> str:
     """
-    Generate personalized career pathway recommendations.
+    Generate personalized final year project ideas based on transcript.
     
     Args:
         df: DataFrame with course information
         student_info: Dictionary with student details
+        num_ideas: Number of project ideas to generate
+        cache: Optional profile-bucket cache shared between similar students
         
     Returns:
-        String with career recommendations
+        String with AI-generated project ideas
     """
-    co = get_cohere_client()
-    
+    return generate_section("project_ideas", df, student_info, num_ideas=num_ideas, cache=cache)
+
+
+def _career_pathways_prompt(df: pd.DataFrame, student_info: Dict) -> str:
+    """Build the career pathways prompt."""
     # Analyze academic profile
-    df_copy = df.copy()
-    df_copy['Subject_Area'] = df_copy['Course_Code'].str[:3]
-    strong_areas = df_copy[df_copy['Grade_Point'] >= 4.0].groupby('Subject_Area').size().sort_values(ascending=False).head(3).index.tolist()
+    strong_areas = top_course_groups(df, strong=True)
     
-    overall_gpa = round(df['Credit_Value'].sum() / df['Credit_Unit'].sum(), 2)
+    gpa = overall_gpa(df)
     department = student_info.get('Department', 'Unknown')
     
-    prompt = f"""You are a career counselor specializing in Nigerian tech and engineering careers.
+    return f"""You are a career counselor specializing in Nigerian tech and engineering careers.
 
 STUDENT PROFILE:
 - Department: {department}
-- GPA: {overall_gpa}/5.0
+- GPA: {gpa}/5.0
 - Strong subject areas: {', '.join(strong_areas)}
 - Courses completed: {len(df)}
 
@@ -131,48 +139,41 @@ For each career path, provide:
 
 Be specific about Nigerian companies like Andela, Flutterwave, Interswitch, banks, oil companies, etc."""
 
-    response = co.chat(
-        model="command-a-03-2025",
-        message=prompt,
-        temperature=0.7,
-    )
-    
-    return response.text
-
 
-def identify_skill_gaps(
+def generate_career_pathways(
     df: pd.DataFrame,
     student_info: Dict,
-    target_role: str | None = None,
+    cache: ProfileBucketCache | None = None,
 ) -> str:
     """
-    Identify skill gaps and provide learning recommendations.
+    Generate personalized career pathway recommendations.
     
     Args:
         df: DataFrame with course information
         student_info: Dictionary with student details
-        target_role: Optional specific career role to target
+        cache: Optional profile-bucket cache shared between similar students
         
     Returns:
-        String with skill gap analysis
+        String with career recommendations
     """
-    co = get_cohere_client()
-    
+    return generate_section("career_pathways", df, student_info, cache=cache)
+
+
+def _skill_gaps_prompt(df: pd.DataFrame, student_info: Dict, target_role: str | None) -> str:
+    """Build the skill gaps prompt."""
     department = student_info.get('Department', 'Unknown')
-    overall_gpa = round(df['Credit_Value'].sum() / df['Credit_Unit'].sum(), 2)
+    gpa = overall_gpa(df)
     
     # Weak areas
-    df_copy = df.copy()
-    df_copy['Subject_Area'] = df_copy['Course_Code'].str[:3]
-    weak_areas = df_copy[df_copy['Grade_Point'] < 3.0].groupby('Subject_Area').size().sort_values(ascending=False).head(3).index.tolist()
+    weak_areas = top_course_groups(df, strong=False)
     
     role_text = f"for a {target_role} role" if target_role else "for the Nigerian job market"
     
-    prompt = f"""You are a skills development coach for Nigerian graduates.
+    return f"""You are a skills development coach for Nigerian graduates.
 
 STUDENT PROFILE:
 - Department: {department}
-- GPA: {overall_gpa}/5.0
+- GPA: {gpa}/5.0
 - Areas needing improvement: {', '.join(weak_areas) if weak_areas else 'None - strong overall'}
 - Total courses: {len(df)}
 
@@ -202,45 +203,51 @@ Provide:
 
 Be specific and actionable for a Nigerian graduate looking for jobs."""
 
-    response = co.chat(
-        model="command-a-03-2025",
-        message=prompt,
-        temperature=0.7,
-    )
-    
-    return response.text
-
 
-def analyze_strengths_weaknesses(df: pd.DataFrame, student_info: Dict) -> str:
+def identify_skill_gaps(
+    df: pd.DataFrame,
+    student_info: Dict,
+    target_role: str | None = None,
+    cache: ProfileBucketCache | None = None,
+) -> str:
     """
-    Detailed analysis of academic strengths and weaknesses.
+    Identify skill gaps and provide learning recommendations.
     
     Args:
         df: DataFrame with course information
         student_info: Dictionary with student details
+        target_role: Optional specific career role to target
+        cache: Optional profile-bucket cache shared between similar students
         
     Returns:
-        String with detailed analysis
+        String with skill gap analysis
     """
-    co = get_cohere_client()
-    
+    return generate_section("skill_gaps", df, student_info, target_role=target_role, cache=cache)
+
+
+def _detailed_analysis_prompt(df: pd.DataFrame, student_info: Dict) -> str:
+    """Build the detailed analysis prompt."""
     # Prepare data
-    overall_gpa = round(df['Credit_Value'].sum() / df['Credit_Unit'].sum(), 2)
+    gpa = overall_gpa(df)
     best_courses = df.nlargest(5, 'Grade_Point')[['Course_Title', 'Grade']].to_dict('records')
     worst_courses = df.nsmallest(5, 'Grade_Point')[['Course_Title', 'Grade']].to_dict('records')
     
     gpa_by_year = df.groupby('Year')['Grade_Point'].mean().round(2).to_dict()
+    strong_groups = top_course_groups(df, strong=True)
+    weak_groups = top_course_groups(df, strong=False)
     
     department = student_info.get('Department', 'Unknown')
     
-    prompt = f"""You are an academic performance analyst for UNILAG students.
+    return f"""You are an academic performance analyst for UNILAG students.
 
 STUDENT PROFILE:
 - Department: {department}
-- Overall GPA: {overall_gpa}/5.0
+- Overall GPA: {gpa}/5.0
 - Best courses: {best_courses}
 - Most challenging courses: {worst_courses}
 - GPA by year: {gpa_by_year}
+- Strong course groups: {', '.join(strong_groups) or 'None'}
+- Weak course groups: {', '.join(weak_groups) or 'None'}
 
 TASK:
 Provide detailed academic analysis covering:
@@ -271,10 +278,244 @@ Provide detailed academic analysis covering:
 
 Be honest but encouraging. Tone should be supportive and motivating."""
 
-    response = co.chat(
-        model="command-a-03-2025",
-        message=prompt,
-        temperature=0.7,
-    )
+
+def analyze_strengths_weaknesses(
+    df: pd.DataFrame,
+    student_info: Dict,
+    cache: ProfileBucketCache | None = None,
+) -> str:
+    """
+    Detailed analysis of academic strengths and weaknesses.
     
-    return response.text
\ No newline at end of file
+    Args:
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+        cache: Optional profile-bucket cache shared between similar students
+        
+    Returns:
+        String with detailed analysis
+    """
+    return generate_section("detailed_analysis", df, student_info, cache=cache)
+
+
+REPORT_SECTIONS = ("project_ideas", "career_pathways", "skill_gaps", "detailed_analysis")
+
+# Section -> builder called as (df, student_info, num_ideas, target_role).
+# Each returns the section's prompt and the extra profile-cache key fields
+# for the inputs it depends on besides the transcript.
+_SECTION_PROMPTS: Dict[str, Callable[[pd.DataFrame, Dict, int, str | None], Tuple[str, tuple]]] = {
+    "project_ideas": lambda df, info, num_ideas, role: (
+        _project_ideas_prompt(df, info, num_ideas), (num_ideas,)
+    ),
+    "career_pathways": lambda df, info, num_ideas, role: (_career_pathways_prompt(df, info), ()),
+    "skill_gaps": lambda df, info, num_ideas, role: (
+        _skill_gaps_prompt(df, info, role), ((role or "").strip().lower(),)
+    ),
+    "detailed_analysis": lambda df, info, num_ideas, role: (_detailed_analysis_prompt(df, info), ()),
+}
+
+REPORT_FORMAT = {
+    "type": "json_object",
+    "schema": {
+        "type": "object",
+        "required": list(REPORT_SECTIONS),
+        "properties": {key: {"type": "string"} for key in REPORT_SECTIONS},
+    },
+}
+
+
+def _split_prompt(prompt: str) -> Tuple[str, List[str], str]:
+    """Split one of the section prompts above into (role, profile lines, task)."""
+    role, rest = prompt.split("\n\nSTUDENT PROFILE:\n", 1)
+    profile, task = rest.split("\n\nTASK:\n", 1)
+    return role, profile.splitlines(), task
+
+
+def _report_prompt(df: pd.DataFrame, student_info: Dict, num_ideas: int, target_role: str | None) -> str:
+    """Build one prompt covering all four sections with a shared student profile."""
+    prompts = {key: _section_prompt(key, df, student_info, num_ideas, target_role)[0] for key in REPORT_SECTIONS}
+
+    profile: List[str] = []
+    tasks = []
+    for key, prompt in prompts.items():
+        role, lines, task = _split_prompt(prompt)
+        profile.extend(line for line in lines if line not in profile)
+        tasks.append(f'### Section "{key}"\nWrite as: {role}\n\n{task}')
+
+    keys = ", ".join(f'"{key}"' for key in REPORT_SECTIONS)
+    profile_text = "\n".join(profile)
+    sections = "\n\n".join(tasks)
+    return f"""You are a team of UNILAG academic and career advisors preparing one advisory report.
+
+STUDENT PROFILE:
+{profile_text}
+
+Write each of the following sections in markdown.
+
+{sections}
+
+OUTPUT FORMAT:
+Respond with a single JSON object with exactly these string keys: {keys}.
+Each value is the complete markdown text for that section. Do not write anything outside the JSON object."""
+
+
+def parse_report(text: str) -> Dict[str, str]:
+    """
+    Validate a combined-report response and split it into sections.
+
+    Args:
+        text: Raw model output, optionally wrapped in a ```json fence
+
+    Returns:
+        Dictionary with every section that came back as non-empty text
+
+    Raises:
+        ValueError: If the output is not a JSON object
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("No JSON object in advisor response")
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in advisor response: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("Advisor response is not a JSON object")
+
+    return {
+        key: data[key].strip()
+        for key in REPORT_SECTIONS
+        if isinstance(data.get(key), str) and data[key].strip()
+    }
+
+
+def _chat_report(prompt: str) -> str:
+    """Ask for the combined report and only return output that validates completely."""
+    def call() -> str:
+        with call_label("full_report"):
+            return get_backend().chat(prompt, temperature=0.7, response_format=REPORT_FORMAT)
+
+    text = advisor_flight.do(prompt_key(prompt, 0.7, REPORT_FORMAT), call)
+    missing = set(REPORT_SECTIONS) - set(parse_report(text))
+    if missing:
+        raise ValueError(f"Advisor response missing sections: {', '.join(sorted(missing))}")
+    return text
+
+
+def generate_full_report(
+    df: pd.DataFrame,
+    student_info: Dict,
+    num_ideas: int = 5,
+    target_role: str | None = None,
+    cache: ProfileBucketCache | None = None,
+) -> Dict[str, str]:
+    """
+    Generate all four advisor sections with a single structured LLM call.
+
+    If the combined response cannot be parsed or is missing a section, the
+    four sections are generated with their own per-section calls instead.
+
+    Args:
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+        num_ideas: Number of project ideas to generate
+        target_role: Optional specific career role to target
+        cache: Optional profile-bucket cache shared between similar students
+
+    Returns:
+        Dictionary keyed by REPORT_SECTIONS with markdown for each tab
+    """
+    prompt = _report_prompt(df, student_info, num_ideas, target_role)
+    role_key = (target_role or "").strip().lower()
+    try:
+        if cache is None:
+            text = _chat_report(prompt)
+        else:
+            key = cache.bucket_key("full_report", df, student_info, (num_ideas, role_key))
+            text = cache.get_or_generate(key, lambda: _chat_report(prompt))
+        sections = parse_report(text)
+    except ValueError:
+        sections = {}
+
+    for key in REPORT_SECTIONS:
+        if key not in sections:
+            sections[key] = generate_section(key, df, student_info, num_ideas, target_role, cache)
+    return {key: sections[key] for key in REPORT_SECTIONS}
+
+
+def generate_section(
+    section: str,
+    df: pd.DataFrame,
+    student_info: Dict,
+    num_ideas: int = 5,
+    target_role: str | None = None,
+    cache: ProfileBucketCache | None = None,
+) -> str:
+    """
+    Generate one advisor section by name.
+
+    Args:
+        section: One of REPORT_SECTIONS
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+        num_ideas: Number of project ideas (project_ideas only)
+        target_role: Optional career role to target (skill_gaps only)
+        cache: Optional profile-bucket cache shared between similar students
+
+    Returns:
+        Markdown text for the section
+    """
+    prompt, extra = _section_prompt(section, df, student_info, num_ideas, target_role)
+    return _respond(section, prompt, df, student_info, cache, extra)
+
+
+def _section_prompt(
+    section: str, df: pd.DataFrame, student_info: Dict, num_ideas: int, target_role: str | None
+) -> Tuple[str, tuple]:
+    """
+    Prompt for one section, looked up in _SECTION_PROMPTS.
+
+    Returns:
+        (prompt, extra profile-cache key fields)
+
+    Raises:
+        ValueError: If section is not one of REPORT_SECTIONS
+    """
+    builder = _SECTION_PROMPTS.get(section)
+    if builder is None:
+        raise ValueError(f"Unknown advisor section: {section}")
+    return builder(df, student_info, num_ideas, target_role)
+
+
+def stream_section(
+    section: str,
+    df: pd.DataFrame,
+    student_info: Dict,
+    num_ideas: int = 5,
+    target_role: str | None = None,
+    cache: ProfileBucketCache | None = None,
+) -> Iterator[str]:
+    """
+    Yield one advisor section as it is generated.
+
+    With a profile cache the section comes from generate_section() in one
+    piece, since it may already be cached. Otherwise chunks are yielded as
+    the backend produces them; streamed calls are not coalesced.
+
+    Args:
+        section: One of REPORT_SECTIONS
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+        num_ideas: Number of project ideas (project_ideas only)
+        target_role: Optional career role to target (skill_gaps only)
+        cache: Optional profile-bucket cache shared between similar students
+
+    Yields:
+        Markdown text chunks
+    """
+    if cache is not None:
+        yield generate_section(section, df, student_info, num_ideas, target_role, cache)
+        return
+    prompt, _ = _section_prompt(section, df, student_info, num_ideas, target_role)
+    with call_label(section):
+        yield from get_backend().stream(prompt, temperature=0.7)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.similarity import CourseIndex
+
+
+def overall_gpa(df: pd.DataFrame) -> float:
+    """Credit-weighted GPA on the 5.0 scale, rounded to 2 places."""
+    return round(df['Credit_Value'].sum() / df['Credit_Unit'].sum(), 2)
+
+
+def top_subject_areas(df: pd.DataFrame, strong: bool = True, n: int = 3) -> List[str]:
+    """
+    Most frequent subject areas among strong (>= 4.0) or weak (< 3.0) courses.
+
+    Args:
+        df: DataFrame with course information
+        strong: Rank strong courses if True, weak courses otherwise
+        n: Number of subject areas to return
+
+    Returns:
+        Subject area codes ordered by number of matching courses
+    """
+    mask = df['Grade_Point'] >= 4.0 if strong else df['Grade_Point'] < 3.0
+    subjects = df['Course_Code'].str[:3]
+    return subjects[mask].value_counts().head(n).index.tolist()
+
+
+def top_course_groups(
+    df: pd.DataFrame,
+    strong: bool = True,
+    n: int = 3,
+    index: CourseIndex | None = None,
+) -> List[str]:
+    """
+    Most frequent groups of related courses among strong or weak courses.
+
+    Unlike top_subject_areas, groups come from course-title similarity, so
+    statistics courses coded MTH and STA count together.
+
+    Args:
+        df: DataFrame with course information
+        strong: Rank strong courses if True, weak courses otherwise
+        n: Number of groups to return
+        index: Course-title index (defaults to the cohort index from
+            COURSE_INDEX_PATH, else one built from this transcript)
+
+    Returns:
+        Labels such as "Statistics (MTH, STA)", ordered by number of matching courses
+    """
+    from src.similarity import CourseIndex, get_course_index
+
+    mask = df['Grade_Point'] >= 4.0 if strong else df['Grade_Point'] < 3.0
+    courses = df.loc[mask, ['Course_Code', 'Course_Title']]
+    if courses.empty:
+        return []
+    index = index or get_course_index() or CourseIndex.from_frame(df)
+    labels = courses['Course_Title'].map(index.group_of)
+    prefixes = courses['Course_Code'].str[:3].groupby(labels).agg(lambda s: ', '.join(sorted(set(s))))
+    return [f"{label} ({prefixes[label]})" for label in labels.value_counts().head(n).index]
+
+
+# -------------------------------------------------------------------
+# Cohort aggregates
+#
+# These work on the concatenated course rows of many students and return
+# small frames, so only aggregates (never row-level data) reach the browser.
+# -------------------------------------------------------------------
+
+def grade_distribution(df: pd.DataFrame) -> pd.DataFrame:
+    """Number of course results per grade."""
+    counts = df['Grade'].value_counts().sort_index()
+    return counts.rename_axis('Grade').reset_index(name='Count')
+
+
+def gpa_by_year(df: pd.DataFrame) -> pd.DataFrame:
+    """Mean grade point, credit-weighted GPA and student count per year of study."""
+    out = df.groupby('Year').agg(
+        Mean_Grade_Point=('Grade_Point', 'mean'),
+        Credit_Value=('Credit_Value', 'sum'),
+        Credit_Unit=('Credit_Unit', 'sum'),
+        Students=('Matric_No', 'nunique'),
+    )
+    out['GPA'] = out['Credit_Value'] / out['Credit_Unit']
+    return out[['Mean_Grade_Point', 'GPA', 'Students']].round(2).reset_index()
+
+
+def course_stats(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-course results across the cohort.
+
+    Returns:
+        One row per Course_Code with title, enrolment, mean grade point,
+        spread, and the share of students below a C (grade point < 3.0)
+    """
+    grouped = df.assign(_below_c=df['Grade_Point'] < 3.0).groupby('Course_Code')
+    out = grouped.agg(
+        Course_Title=('Course_Title', 'first'),
+        Credit_Unit=('Credit_Unit', 'first'),
+        Students=('Matric_No', 'nunique'),
+        Mean_Grade_Point=('Grade_Point', 'mean'),
+        Std_Grade_Point=('Grade_Point', 'std'),
+        Below_C_Rate=('_below_c', 'mean'),
+    )
+    out[['Mean_Grade_Point', 'Std_Grade_Point']] = out[['Mean_Grade_Point', 'Std_Grade_Point']].round(2)
+    out['Below_C_Rate'] = out['Below_C_Rate'].round(3)
+    return out.reset_index()
+
+
+def paginate(df: pd.DataFrame, page: int, page_size: int = 50) -> Tuple[pd.DataFrame, int]:
+    """
+    One page of a frame.
+
+    Args:
+        df: Frame to page through
+        page: 1-based page number (clamped to the valid range)
+        page_size: Rows per page
+
+    Returns:
+        Tuple of (rows on the page, total number of pages)
+    """
+    pages = max(1, -(-len(df) // page_size))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], pages
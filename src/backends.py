@@ -0,0 +1,262 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_MODEL = "command-a-03-2025"
+
+
+class BackendError(RuntimeError):
+    """Raised when an LLM backend fails to produce a response."""
+
+
+class LLMBackend(ABC):
+    """
+    Interface the advisor functions talk to.
+
+    Implementations only need chat(); stream() falls back to yielding the
+    whole response as a single chunk. response_format follows Cohere's
+    {"type": "json_object", "schema": {...}} shape.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def chat(self, prompt: str, temperature: float = 0.7, response_format: dict | None = None) -> str:
+        """Complete a prompt and return the response text."""
+
+    def stream(self, prompt: str, temperature: float = 0.7) -> Iterator[str]:
+        yield self.chat(prompt, temperature)
+
+
+def get_cohere_client(timeout: float | None = None):
+    """Initialize Cohere client."""
+    import cohere
+
+    api_key = os.getenv('COHERE_API_KEY')
+    if not api_key:
+        raise ValueError(
+            "COHERE_API_KEY not found in .env file.\n"
+            "Get a free API key at: https://dashboard.cohere.com"
+        )
+    if timeout is not None:
+        return cohere.Client(api_key, timeout=timeout)
+    return cohere.Client(api_key)
+
+
+class CohereBackend(LLMBackend):
+    """Cohere chat API."""
+
+    name = "cohere"
+
+    def __init__(self, model: str = DEFAULT_MODEL, timeout: float | None = None):
+        self.model = model
+        self.timeout = timeout
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_cohere_client(self.timeout)
+        return self._client
+
+    def chat(self, prompt: str, temperature: float = 0.7, response_format: dict | None = None) -> str:
+        kwargs = {"response_format": response_format} if response_format else {}
+        response = self.client.chat(
+            model=self.model,
+            message=prompt,
+            temperature=temperature,
+            **kwargs,
+        )
+        return response.text
+
+    def stream(self, prompt: str, temperature: float = 0.7) -> Iterator[str]:
+        for event in self.client.chat_stream(
+            model=self.model,
+            message=prompt,
+            temperature=temperature,
+        ):
+            if event.event_type == "text-generation":
+                yield event.text
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for load testing and local development.
+
+    The response text is a pure function of the prompt. Latency and errors
+    are drawn from a seeded RNG, so a run can be repeated exactly.
+
+    Args:
+        latency: "fixed", "uniform", "exponential" or "lognormal"
+        latency_ms: Median (lognormal), mean (exponential) or base latency
+        spread: Lognormal sigma, or +/- fraction of latency_ms for uniform
+        error_rate: Probability that a call raises BackendError
+        stall_rate: Probability that a call hangs for stall_ms before answering
+        stall_ms: Length of an injected stall
+        chunk_words: Words per chunk when streaming
+        seed: RNG seed for latency and error draws
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: str = "lognormal",
+        latency_ms: float = 800.0,
+        spread: float = 0.5,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_ms: float = 30000.0,
+        chunk_words: int = 8,
+        seed: int | None = 0,
+    ):
+        if latency not in ("fixed", "uniform", "exponential", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {latency}")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.spread = spread
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.chunk_words = chunk_words
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def sample_latency(self) -> float:
+        """Draw one call latency in seconds."""
+        with self._lock:
+            rng = self._rng
+            if self.latency == "fixed":
+                ms = self.latency_ms
+            elif self.latency == "uniform":
+                ms = rng.uniform(self.latency_ms * (1 - self.spread), self.latency_ms * (1 + self.spread))
+            elif self.latency == "exponential":
+                ms = rng.expovariate(1.0 / self.latency_ms)
+            else:
+                ms = rng.lognormvariate(0.0, self.spread) * self.latency_ms
+            if rng.random() < self.stall_rate:
+                ms += self.stall_ms
+        return max(ms, 0.0) / 1000.0
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            return self._rng.random() < self.error_rate
+
+    def render(self, prompt: str) -> str:
+        """Deterministic markdown answer for a prompt."""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        task = next(
+            (line.strip() for line in prompt.splitlines() if line.strip() and not line.startswith("You are")),
+            "request",
+        )
+        lines = [f"**Offline response {digest[:8]}**", "", f"_{task}_", ""]
+        for i in range(5):
+            chunk = digest[i * 8:(i + 1) * 8]
+            lines.append(f"{i + 1}. Recommendation {chunk}: practise, build, review and repeat.")
+        return "\n".join(lines)
+
+    def chat(self, prompt: str, temperature: float = 0.7, response_format: dict | None = None) -> str:
+        fail = self._should_fail()
+        time.sleep(self.sample_latency())
+        if fail:
+            raise BackendError("Injected failure from FakeBackend")
+        if response_format and response_format.get("type") == "json_object":
+            keys = response_format.get("schema", {}).get("properties", {})
+            return json.dumps({key: self.render(f"{prompt}\n{key}") for key in keys})
+        return self.render(prompt)
+
+    def stream(self, prompt: str, temperature: float = 0.7) -> Iterator[str]:
+        fail = self._should_fail()
+        words = self.render(prompt).split(" ")
+        n_chunks = max(1, -(-len(words) // self.chunk_words))
+        delay = self.sample_latency() / n_chunks
+        for i in range(0, len(words), self.chunk_words):
+            time.sleep(delay)
+            if fail and i >= len(words) // 2:
+                raise BackendError("Injected failure from FakeBackend mid-stream")
+            yield " ".join(words[i:i + self.chunk_words]) + " "
+
+
+_backend: LLMBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def backend_from_env() -> LLMBackend:
+    """
+    Build a backend from ADVISOR_BACKEND ("cohere" or "fake").
+
+    The fake backend reads FAKE_LLM_LATENCY, FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_SPREAD, FAKE_LLM_ERROR_RATE, FAKE_LLM_STALL_RATE,
+    FAKE_LLM_STALL_MS and FAKE_LLM_SEED.
+    """
+    kind = os.getenv("ADVISOR_BACKEND", "cohere").lower()
+    if kind == "cohere":
+        timeout = float(os.getenv("ADVISOR_TIMEOUT_S", "60"))
+        return CohereBackend(os.getenv("COHERE_MODEL", DEFAULT_MODEL), timeout=timeout)
+    if kind == "fake":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return FakeBackend(
+            latency=os.getenv("FAKE_LLM_LATENCY", "lognormal"),
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "800")),
+            spread=float(os.getenv("FAKE_LLM_SPREAD", "0.5")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            stall_rate=float(os.getenv("FAKE_LLM_STALL_RATE", "0")),
+            stall_ms=float(os.getenv("FAKE_LLM_STALL_MS", "30000")),
+            seed=int(seed) if seed else None,
+        )
+    raise ValueError(f"Unknown ADVISOR_BACKEND: {kind}")
+
+
+def resilient_from_env(inner: LLMBackend) -> LLMBackend:
+    """
+    Wrap a backend with deadlines, retries, hedging and a circuit breaker.
+
+    Reads ADVISOR_TIMEOUT_S, ADVISOR_RETRIES, ADVISOR_HEDGE,
+    ADVISOR_HEDGE_QUANTILE, ADVISOR_BREAKER_ERROR_RATE,
+    ADVISOR_BREAKER_WINDOW and ADVISOR_BREAKER_COOLDOWN_S.
+    """
+    from src.resilience import CallPolicy, CircuitBreaker, ResilientBackend
+
+    policy = CallPolicy(
+        timeout_s=float(os.getenv("ADVISOR_TIMEOUT_S", "60")),
+        retries=int(os.getenv("ADVISOR_RETRIES", "1")),
+        hedge=os.getenv("ADVISOR_HEDGE", "").lower() in ("1", "true", "yes"),
+        hedge_quantile=float(os.getenv("ADVISOR_HEDGE_QUANTILE", "0.95")),
+    )
+    window = int(os.getenv("ADVISOR_BREAKER_WINDOW", "20"))
+    breaker = CircuitBreaker(
+        error_rate=float(os.getenv("ADVISOR_BREAKER_ERROR_RATE", "0.5")),
+        window=window,
+        min_calls=max(1, window // 2),
+        cooldown_s=float(os.getenv("ADVISOR_BREAKER_COOLDOWN_S", "30")),
+    )
+    return ResilientBackend(inner, policy, breaker)
+
+
+def get_backend() -> LLMBackend:
+    """Process-wide backend, created from the environment on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = resilient_from_env(backend_from_env())
+        return _backend
+
+
+def set_backend(backend: LLMBackend | None) -> None:
+    """Replace the process-wide backend (None re-reads the environment)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
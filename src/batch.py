@@ -0,0 +1,123 @@
+from __future__ import annotations
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from src.parser import content_hash, get_quick_stats, parse_transcript
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class ParseResult:
+    """Outcome of parsing one file in a batch."""
+    name: str
+    digest: str
+    df: pd.DataFrame | None = None
+    student_info: Dict | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _parse_bytes(data: bytes) -> Tuple[pd.DataFrame, Dict]:
+    # Top-level so it can be pickled into worker processes
+    return parse_transcript(io.BytesIO(data))
+
+
+def default_workers() -> int:
+    return int(os.getenv("PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def parse_many(
+    files: Iterable[Tuple[str, bytes]],
+    max_workers: int | None = None,
+    on_progress: Callable[[int, int, ParseResult], None] | None = None,
+    digests: Sequence[str] | None = None,
+) -> List[ParseResult]:
+    """
+    Parse many transcripts concurrently in a process pool.
+
+    Files with identical content are parsed once.
+
+    Args:
+        files: (name, pdf bytes) pairs
+        max_workers: Worker processes (defaults to PARSE_WORKERS or CPU count)
+        on_progress: Called as (completed, total, result) after each file finishes
+        digests: content_hash() of each file, if the caller already has them
+
+    Returns:
+        One ParseResult per input file, in input order
+    """
+    files = list(files)
+    digests = list(digests) if digests is not None else [content_hash(data) for _, data in files]
+    unique: Dict[str, bytes] = {}
+    for digest, (_, data) in zip(digests, files):
+        unique.setdefault(digest, data)
+
+    parsed: Dict[str, ParseResult] = {}
+    total = len(files)
+    done = 0
+
+    def finished(digest: str, result: ParseResult) -> None:
+        nonlocal done
+        parsed[digest] = result
+        # Report every file that shares this content, not just the first
+        for name, d in zip((name for name, _ in files), digests):
+            if d == digest:
+                done += 1
+                if on_progress:
+                    on_progress(done, total, ParseResult(name, d, result.df, result.student_info, result.error))
+
+    workers = min(max_workers or default_workers(), max(len(unique), 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_parse_bytes, data): digest for digest, data in unique.items()}
+        for future in as_completed(futures):
+            digest = futures[future]
+            try:
+                df, info = future.result()
+                finished(digest, ParseResult("", digest, df, info))
+            except Exception as e:
+                finished(digest, ParseResult("", digest, error=str(e) or type(e).__name__))
+
+    return [
+        ParseResult(name, digest, parsed[digest].df, parsed[digest].student_info, parsed[digest].error)
+        for (name, _), digest in zip(files, digests)
+    ]
+
+
+def cohort_frame(results: Iterable[ParseResult]) -> pd.DataFrame:
+    """Concatenate the course rows of every successfully parsed transcript."""
+    import pandas as pd
+
+    frames = [r.df for r in results if r.ok and r.df is not None and len(r.df)]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def cohort_summary(results: Iterable[ParseResult]) -> pd.DataFrame:
+    """One row per file: student details, headline stats and parse status."""
+    import pandas as pd
+
+    rows = []
+    for r in results:
+        row = {"File": r.name, "Status": "ok" if r.ok else f"error: {r.error}"}
+        if r.ok:
+            info = r.student_info or {}
+            stats = get_quick_stats(r.df)
+            row.update({
+                "Name": info.get("Name"),
+                "Matric_No": info.get("Matric_No"),
+                "Department": info.get("Department"),
+                "Courses": stats["total_courses"],
+                "Credits": stats["total_credits"],
+                "GPA": stats["overall_gpa"],
+            })
+        rows.append(row)
+    return pd.DataFrame(rows)
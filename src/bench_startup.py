@@ -0,0 +1,83 @@
+"""
+Measure cold import time of the app and library modules.
+
+Each module is imported in a fresh interpreter with ``-X importtime`` so
+nothing is shared between measurements. Run from the repository root:
+
+    python -m src.bench_startup [--repeat 5] [module ...]
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = [
+    # What the landing page needs
+    "streamlit",
+    "src.parser",
+    "src.cache",
+    # Loaded only once a transcript is parsed or an advisor runs
+    "pdfplumber",
+    "pandas",
+    "plotly.express",
+    "src.advisor",
+    "cohere",
+]
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import one module in a fresh interpreter.
+
+    Returns:
+        Cumulative import time of the module in ms, and the cumulative time
+        of each module it imported directly
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise ImportError(proc.stderr.strip().splitlines()[-1])
+
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if not parts[1].strip().isdigit():
+            continue  # header row
+        cumulative_ms = int(parts[1]) / 1000.0
+        name = parts[2][1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0 and name.strip() == module:
+            total = cumulative_ms
+        elif depth == 1:
+            packages[name.strip()] = cumulative_ms
+    return total, packages
+
+
+def run(modules: List[str], repeat: int = 5) -> None:
+    print(f"{'module':<20} {'median ms':>10} {'min ms':>8}  heaviest imports")
+    for module in modules:
+        try:
+            samples = [import_profile(module) for _ in range(repeat)]
+        except ImportError as e:
+            print(f"{module:<20} {'n/a':>10} {'':>8}  {e}")
+            continue
+        times = [t for t, _ in samples]
+        heaviest = sorted(samples[-1][1].items(), key=lambda kv: kv[1], reverse=True)[:3]
+        top = ", ".join(f"{name} {ms:.0f}" for name, ms in heaviest)
+        print(f"{module:<20} {statistics.median(times):>10.1f} {min(times):>8.1f}  {top}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.modules, args.repeat)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import random
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, List, Tuple
+
+from src.analyzer import overall_gpa, top_subject_areas
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass(frozen=True)
+class BucketConfig:
+    """
+    How student profiles are collapsed into cache buckets.
+
+    Attributes:
+        gpa_step: Width of a GPA band (0.5 puts 4.21 and 4.44 together)
+        subject_count: How many top subject areas go into the key
+        subject_basis: "strong", "weak" or "both" subject areas
+        ordered_subjects: Keep subject ranking in the key instead of a set
+        variants: Responses kept per bucket before answers are reused
+    """
+    gpa_step: float = 0.5
+    subject_count: int = 3
+    subject_basis: str = "strong"
+    ordered_subjects: bool = False
+    variants: int = 3
+
+
+class ProfileBucketCache:
+    """
+    Share advisor responses between students with near-identical profiles.
+
+    A bucket is keyed on department, GPA band and top subject areas rather
+    than on the exact prompt. Each bucket fills a small pool of responses
+    before it starts serving random picks from that pool, so similar
+    students do not all see the same text.
+    """
+
+    def __init__(self, config: BucketConfig | None = None, max_buckets: int = 1024, seed: int | None = None):
+        self.config = config or BucketConfig()
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Hashable, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.hits = 0
+        self.misses = 0
+
+    def bucket_key(self, kind: str, df: pd.DataFrame, student_info: Dict, extra: Tuple = ()) -> Tuple:
+        """
+        Canonical bucket for one advisor request.
+
+        Args:
+            kind: Advisor function name, so different outputs never mix
+            df: DataFrame with course information
+            student_info: Dictionary with student details
+            extra: Request options that change the answer (e.g. num_ideas)
+
+        Returns:
+            Hashable bucket key
+        """
+        cfg = self.config
+        department = (student_info.get('Department') or 'Unknown').strip().upper()
+        gpa_band = round(round(overall_gpa(df) / cfg.gpa_step) * cfg.gpa_step, 2)
+
+        def areas(strong: bool) -> Tuple:
+            found = top_subject_areas(df, strong=strong, n=cfg.subject_count)
+            return tuple(found) if cfg.ordered_subjects else tuple(sorted(found))
+
+        # Strong and weak areas are ordered separately, so the separator keeps them apart
+        subjects: Tuple = ()
+        if cfg.subject_basis in ("strong", "both"):
+            subjects += areas(strong=True)
+        if cfg.subject_basis in ("weak", "both"):
+            subjects += ("|",) + areas(strong=False)
+
+        return (kind, department, gpa_band, subjects) + tuple(extra)
+
+    def get_or_generate(self, key: Hashable, generate: Callable[[], str]) -> str:
+        """
+        Return a pooled response for the bucket, generating one if the pool is short.
+
+        Args:
+            key: Bucket key from bucket_key()
+            generate: Zero-argument callable that produces a fresh response
+
+        Returns:
+            Response text
+        """
+        with self._lock:
+            pool = self._buckets.get(key)
+            if pool is not None:
+                self._buckets.move_to_end(key)
+                if len(pool) >= self.config.variants:
+                    self.hits += 1
+                    return self._rng.choice(pool)
+            self.misses += 1
+
+        # Generate outside the lock so one slow call does not block other buckets
+        text = generate()
+
+        with self._lock:
+            pool = self._buckets.setdefault(key, [])
+            self._buckets.move_to_end(key)
+            if len(pool) < self.config.variants:
+                pool.append(text)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return text
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "buckets": len(self._buckets),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import io
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Tuple, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+# Student details copied onto every course row so each export is self-contained
+STUDENT_COLUMNS = ["Faculty", "Department", "Sex", "DOB", "Year_of_Award"]
+
+COLUMNS = [
+    "Name", "Matric_No", *STUDENT_COLUMNS, "Session", "Year",
+    "Course_Code", "Course_Title", "Credit_Unit", "Grade", "Grade_Point", "Credit_Value",
+]
+
+Sink = Union[str, IO[bytes]]
+Part = Tuple["pd.DataFrame", Dict]
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is required for Arrow and Parquet export.\n"
+            "Install it with: pip install pyarrow"
+        ) from e
+    return pa
+
+
+def schema() -> pa.Schema:
+    """Fixed export schema, so every part of a streamed cohort lines up."""
+    pa = _pyarrow()
+    return pa.schema([
+        ("Name", pa.string()),
+        ("Matric_No", pa.string()),
+        *[(col, pa.string()) for col in STUDENT_COLUMNS],
+        ("Session", pa.string()),
+        ("Year", pa.int16()),
+        ("Course_Code", pa.string()),
+        ("Course_Title", pa.string()),
+        ("Credit_Unit", pa.int16()),
+        ("Grade", pa.string()),
+        ("Grade_Point", pa.float64()),
+        ("Credit_Value", pa.float64()),
+    ])
+
+
+def export_frame(df: pd.DataFrame, student_info: Dict | None = None) -> pd.DataFrame:
+    """
+    Course rows in export column order, with student details filled in.
+
+    Args:
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+
+    Returns:
+        DataFrame with exactly COLUMNS
+    """
+    info = student_info or {}
+    out = df.reindex(columns=COLUMNS)
+    for col in STUDENT_COLUMNS:
+        if col not in df.columns:
+            out[col] = info.get(col)
+    out["Year"] = out["Year"].astype("Int16")
+    out["Credit_Unit"] = out["Credit_Unit"].astype("Int16")
+    return out
+
+
+def _arrow_column(pa, df: pd.DataFrame, field: pa.Field, info: Dict) -> pa.Array:
+    """One export column as an Arrow array, without an intermediate frame."""
+    if field.name in df.columns:
+        # Numeric columns come straight from their NumPy buffers; int16 is an Arrow cast
+        array = pa.Array.from_pandas(df[field.name])
+        return array if array.type == field.type else array.cast(field.type)
+    value = info.get(field.name) if field.name in STUDENT_COLUMNS else None
+    if value is None:
+        return pa.nulls(len(df), field.type)
+    return pa.repeat(pa.scalar(value).cast(field.type), len(df))
+
+
+def to_arrow_table(df: pd.DataFrame, student_info: Dict | None = None) -> pa.Table:
+    """
+    Arrow table of one transcript.
+
+    Each column is converted from df directly; student details missing from
+    df are repeated from student_info.
+    """
+    pa = _pyarrow()
+    target = schema()
+    info = student_info or {}
+    return pa.Table.from_arrays([_arrow_column(pa, df, field, info) for field in target], schema=target)
+
+
+def _parts(data: Union[pd.DataFrame, Iterable[Part]], student_info: Dict | None) -> Iterable[Part]:
+    import pandas as pd
+
+    if isinstance(data, pd.DataFrame):
+        return [(data, student_info or {})]
+    return data
+
+
+def write_ipc(
+    data: Union[pd.DataFrame, Iterable[Part]],
+    sink: Sink,
+    student_info: Dict | None = None,
+    max_chunksize: int = 65536,
+) -> int:
+    """
+    Write course records as an Arrow IPC file, one part at a time.
+
+    Args:
+        data: One DataFrame, or an iterable of (df, student_info) parts for a cohort
+        sink: Path or binary file object
+        student_info: Student details when data is a single DataFrame
+        max_chunksize: Largest record batch written
+
+    Returns:
+        Number of rows written
+    """
+    pa = _pyarrow()
+    rows = 0
+    with pa.ipc.new_file(sink, schema()) as writer:
+        for df, info in _parts(data, student_info):
+            table = to_arrow_table(df, info)
+            writer.write_table(table, max_chunksize=max_chunksize)
+            rows += table.num_rows
+    return rows
+
+
+def write_parquet(
+    data: Union[pd.DataFrame, Iterable[Part]],
+    sink: Sink,
+    student_info: Dict | None = None,
+    row_group_size: int = 65536,
+    compression: str = "zstd",
+) -> int:
+    """
+    Write course records to Parquet, streaming parts as row groups.
+
+    Small parts are buffered until they fill a row group so large cohorts
+    do not end up with thousands of tiny groups.
+
+    Returns:
+        Number of rows written
+    """
+    pa = _pyarrow()
+    rows = 0
+    pending = []
+    pending_rows = 0
+    with pa.parquet.ParquetWriter(sink, schema(), compression=compression) as writer:
+        for df, info in _parts(data, student_info):
+            table = to_arrow_table(df, info)
+            pending.append(table)
+            pending_rows += table.num_rows
+            if pending_rows >= row_group_size:
+                writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+                rows += pending_rows
+                pending, pending_rows = [], 0
+        if pending:
+            writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+            rows += pending_rows
+    return rows
+
+
+def write_csv(
+    data: Union[pd.DataFrame, Iterable[Part]],
+    sink: Sink,
+    student_info: Dict | None = None,
+) -> int:
+    """Write course records to CSV, one part at a time. Returns rows written."""
+    rows = 0
+    close = isinstance(sink, str)
+    f = open(sink, "w", newline="", encoding="utf-8") if close else io.TextIOWrapper(sink, encoding="utf-8", newline="")
+    try:
+        for i, (df, info) in enumerate(_parts(data, student_info)):
+            part = export_frame(df, info)
+            part.to_csv(f, index=False, header=i == 0)
+            rows += len(part)
+    finally:
+        if close:
+            f.close()
+        else:
+            f.detach()
+    return rows
+
+
+def read_ipc(path: str) -> pa.Table:
+    """Memory-map an Arrow IPC export; column buffers are not copied."""
+    pa = _pyarrow()
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
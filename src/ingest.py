@@ -0,0 +1,474 @@
+"""
+Watch a directory for transcript PDFs and ingest them into a SQLite store.
+
+Run from the repository root:
+
+    python -m src.ingest /shared/transcripts --store ingest.db --metrics-port 9100
+
+Files are deduplicated by content hash, parsed in a bounded process pool
+and written to the store one transaction per file, together with the
+record that the file is done. A restarted daemon therefore never parses
+a file twice. GET /metrics on the metrics port reports queue depth and
+throughput.
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import logging
+import os
+import signal
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Tuple
+
+from src import snapshot
+from src.batch import default_workers
+from src.export import COLUMNS, STUDENT_COLUMNS, export_frame
+from src.parser import content_hash, parse_transcript
+
+log = logging.getLogger("ingest")
+
+INTEGER_COLUMNS = {"Year", "Credit_Unit"}
+REAL_COLUMNS = {"Grade_Point", "Credit_Value"}
+
+# Columns of a parsed transcript (what parse_transcript returns)
+TRANSCRIPT_COLUMNS = [c for c in COLUMNS if c not in STUDENT_COLUMNS]
+
+
+def _parse_file(path: str):
+    # Top-level so it can be pickled into worker processes. The digest is
+    # taken from the bytes actually parsed, in case the file changed since the scan.
+    with open(path, "rb") as f:
+        data = f.read()
+    df, info = parse_transcript(io.BytesIO(data))
+    return content_hash(data), df, info
+
+
+class IngestStore:
+    """
+    SQLite store of ingested transcripts and ingestion progress.
+
+    Tables:
+        files: one row per content hash with its status ("done" or "failed")
+        paths: last seen size/mtime/hash per path, so unchanged files are not re-read
+        students: student details per content hash
+        courses: course rows in export column order, tagged with the content hash
+        advice: advisor sections generated for a transcript (see src.reports)
+        snapshots: the parse result as a binary snapshot (see src.snapshot), for fast reloads
+    """
+
+    def __init__(self, path: str):
+        # Only the daemon loop writes, but it need not run on the opening thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        column_defs = ", ".join(
+            f'"{c}" {"INTEGER" if c in INTEGER_COLUMNS else "REAL" if c in REAL_COLUMNS else "TEXT"}'
+            for c in COLUMNS
+        )
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS files (
+                digest TEXT PRIMARY KEY, name TEXT, status TEXT, error TEXT, ingested_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS paths (
+                path TEXT PRIMARY KEY, size INTEGER, mtime REAL, digest TEXT
+            );
+            CREATE TABLE IF NOT EXISTS students (
+                digest TEXT PRIMARY KEY, name TEXT, matric_no TEXT, info TEXT
+            );
+            CREATE TABLE IF NOT EXISTS courses (digest TEXT, {column_defs});
+            CREATE INDEX IF NOT EXISTS courses_digest ON courses (digest);
+            CREATE TABLE IF NOT EXISTS advice (
+                digest TEXT, section TEXT, text TEXT, created_at REAL, PRIMARY KEY (digest, section)
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (digest TEXT PRIMARY KEY, data BLOB);
+        """)
+        self.conn.commit()
+
+    def known(self, digest: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM files WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def path_digest(self, path: str, size: int, mtime: float) -> str | None:
+        """Content hash recorded for a path, if the file has not changed since."""
+        row = self.conn.execute(
+            "SELECT digest FROM paths WHERE path = ? AND size = ? AND mtime = ?", (path, size, mtime)
+        ).fetchone()
+        return row[0] if row else None
+
+    def remember_path(self, path: str, size: int, mtime: float, digest: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?)", (path, size, mtime, digest))
+        self.conn.commit()
+
+    def record(self, digest: str, name: str, df, student_info: Dict) -> None:
+        """Append one parsed transcript and mark it done, atomically."""
+        frame = export_frame(df, student_info).astype(object)
+        rows = [(digest, *row) for row in frame.where(frame.notna(), None).itertuples(index=False)]
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO students VALUES (?, ?, ?, ?)",
+                (digest, student_info.get("Name"), student_info.get("Matric_No"), json.dumps(student_info)),
+            )
+            self.conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (digest, snapshot.dumps(df, student_info)))
+            self.conn.execute("DELETE FROM courses WHERE digest = ?", (digest,))
+            self.conn.executemany(f"INSERT INTO courses VALUES ({', '.join('?' * (len(COLUMNS) + 1))})", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, 'done', NULL, ?)", (digest, name, time.time())
+            )
+
+    def record_failure(self, digest: str, name: str, error: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, 'failed', ?, ?)", (digest, name, error, time.time())
+            )
+
+    def transcript(self, digest: str):
+        """
+        (df, student_info) of one ingested transcript.
+
+        The frame has parse_transcript's columns and is the caller's to modify,
+        whether it comes from a snapshot or, for transcripts ingested before
+        snapshots were stored, from the course rows.
+        """
+        row = self.conn.execute("SELECT data FROM snapshots WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            # A bytearray, so the numeric columns viewing it are writable
+            return snapshot.loads(bytearray(row[0]))
+        return self._transcript_from_rows(digest)
+
+    def _transcript_from_rows(self, digest: str):
+        import pandas as pd
+
+        row = self.conn.execute("SELECT info FROM students WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(digest)
+        columns = ", ".join(f'"{c}"' for c in TRANSCRIPT_COLUMNS)
+        df = pd.read_sql_query(f"SELECT {columns} FROM courses WHERE digest = ?", self.conn, params=(digest,))
+        return df, json.loads(row[0])
+
+    def digests(self, department: str | None = None) -> List[str]:
+        """Content hashes of ingested transcripts, optionally for one department."""
+        rows = self.conn.execute(
+            "SELECT f.digest, s.info FROM files f JOIN students s USING (digest) WHERE f.status = 'done' ORDER BY f.digest"
+        ).fetchall()
+        if department is None:
+            return [digest for digest, _ in rows]
+        wanted = department.strip().upper()
+        return [d for d, info in rows if (json.loads(info).get("Department") or "").strip().upper() == wanted]
+
+    def _snapshots(self, digests: List[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        for i in range(0, len(digests), 500):
+            chunk = digests[i:i + 500]
+            found.update(self.conn.execute(
+                f"SELECT digest, data FROM snapshots WHERE digest IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return found
+
+    def cohort(self, department: str | None = None, info_columns: Tuple[str, ...] = ("Department",)):
+        """
+        Course rows of every ingested transcript as one frame (see snapshot.concat).
+
+        Transcripts ingested before snapshots were stored get one built from
+        their course rows first, so they are included from then on.
+        """
+        digests = self.digests(department)
+        found = self._snapshots(digests)
+        missing = [d for d in digests if d not in found]
+        if missing:
+            with self.conn:
+                for digest in missing:
+                    found[digest] = snapshot.dumps(*self._transcript_from_rows(digest))
+                    self.conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (digest, found[digest]))
+            log.info("backfilled %d snapshot(s)", len(missing))
+        return snapshot.concat([found[d] for d in digests], info_columns)
+
+    def advice(self, digest: str) -> Dict[str, str]:
+        """Stored advisor sections of one transcript, by section name."""
+        return dict(self.conn.execute("SELECT section, text FROM advice WHERE digest = ?", (digest,)).fetchall())
+
+    def record_advice(self, digest: str, sections: Dict[str, str]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO advice VALUES (?, ?, ?, ?)",
+                [(digest, section, text, time.time()) for section, text in sections.items()],
+            )
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class IngestDaemon:
+    """
+    Poll a directory and feed new transcripts through a bounded process pool.
+
+    Args:
+        watch_dir: Directory to watch (not recursive)
+        store: Where results and progress are written
+        workers: Parser processes (defaults to PARSE_WORKERS or CPU count)
+        queue_limit: Files submitted to the pool beyond one per worker
+        interval_s: Seconds between directory scans
+        settle_s: Ignore files modified more recently than this (still being copied)
+        neighbors_path: Keep a NeighborIndex of ingested students at this path
+
+    A worker process that dies takes every in-flight parse with it. Those
+    files are queued again on a fresh pool; a file is recorded as failed
+    only after it has been in flight for MAX_CRASHES pool crashes.
+    """
+
+    MAX_CRASHES = 3
+
+    def __init__(
+        self,
+        watch_dir: str,
+        store: IngestStore,
+        workers: int | None = None,
+        queue_limit: int = 8,
+        interval_s: float = 5.0,
+        settle_s: float = 2.0,
+        neighbors_path: str | None = None,
+    ):
+        self.watch_dir = watch_dir
+        self.store = store
+        self.workers = workers or default_workers()
+        self.capacity = self.workers + queue_limit
+        self.interval_s = interval_s
+        self.settle_s = settle_s
+        self.neighbors_path = neighbors_path
+        self.neighbors = None
+        self._neighbors_dirty = False
+        if neighbors_path:
+            from src.neighbors import NeighborIndex
+
+            exists = os.path.exists(neighbors_path)
+            self.neighbors = NeighborIndex.load(neighbors_path) if exists else NeighborIndex()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.pending: Deque[Tuple[str, str]] = deque()  # (digest, path) waiting for a pool slot
+        # Future -> (digest, path, pool it was submitted to)
+        self.in_flight: Dict[Future, Tuple[str, str, ProcessPoolExecutor]] = {}
+        self._queued: set = set()
+        self._crashes: Dict[str, int] = {}
+        self.pool_restarts = 0
+        self._done_times: Deque[float] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.started = time.time()
+        self.parsed = 0
+        self.failed = 0
+        self.duplicates = 0
+
+    # ---------------------------------------------------------------
+    # Loop
+    # ---------------------------------------------------------------
+    def scan(self) -> int:
+        """Queue every settled, not yet ingested PDF in the directory. Returns files queued."""
+        queued = 0
+        now = time.time()
+        for entry in sorted(os.scandir(self.watch_dir), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+                continue
+            st = entry.stat()
+            if now - st.st_mtime < self.settle_s:
+                continue
+            digest = self.store.path_digest(entry.path, st.st_size, st.st_mtime)
+            if digest is None:
+                with open(entry.path, "rb") as f:
+                    digest = content_hash(f.read())
+                self.store.remember_path(entry.path, st.st_size, st.st_mtime, digest)
+                if self.store.known(digest) or digest in self._queued:
+                    with self._lock:
+                        self.duplicates += 1
+                    continue
+            if self.store.known(digest) or digest in self._queued:
+                continue
+            self._queued.add(digest)
+            with self._lock:
+                self.pending.append((digest, entry.path))
+            queued += 1
+        return queued
+
+    def pump(self) -> None:
+        """Move pending files into the pool while it has free slots."""
+        with self._lock:
+            while self.pending and len(self.in_flight) < self.capacity:
+                digest, path = self.pending[0]
+                try:
+                    future = self.pool.submit(_parse_file, path)
+                except BrokenProcessPool:
+                    # Broke since the last collect; its in-flight files come back from there
+                    self._restart_pool(self.pool)
+                    continue
+                self.pending.popleft()
+                self.in_flight[future] = (digest, path, self.pool)
+
+    def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        # Caller holds the lock. The crashed pool's other futures fail later
+        # with the same error; by then the pool has already been replaced.
+        if broken is not self.pool:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.pool_restarts += 1
+        log.warning("parser pool crashed; restarted it")
+
+    def _requeue_crashed(self, digest: str, path: str, error: BaseException) -> bool:
+        """Queue a file lost to a pool crash again; False once it has crashed too often."""
+        crashes = self._crashes.get(digest, 0) + 1
+        if crashes >= self.MAX_CRASHES:
+            self._crashes.pop(digest, None)
+            return False
+        self._crashes[digest] = crashes
+        with self._lock:
+            self.pending.appendleft((digest, path))
+        log.warning("requeued %s after a worker crash: %s", os.path.basename(path), error)
+        return True
+
+    def collect(self, timeout: float) -> None:
+        """Write finished parses to the store, waiting up to timeout for the first one."""
+        with self._lock:
+            futures = list(self.in_flight)
+        if not futures:
+            self._stop.wait(timeout)
+            return
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            with self._lock:
+                digest, path, pool = self.in_flight.pop(future)
+            name = os.path.basename(path)
+            try:
+                try:
+                    parsed_digest, df, info = future.result()
+                except BrokenProcessPool as e:
+                    with self._lock:
+                        self._restart_pool(pool)
+                    if self._requeue_crashed(digest, path, e):
+                        continue  # Still in _queued; not a result yet
+                    raise
+                self._crashes.pop(digest, None)
+                # Recorded under the hash of what was parsed; a file rewritten
+                # after its scan is picked up again by the next one
+                self.store.record(parsed_digest, name, df, info)
+                if self.neighbors is not None and len(df):
+                    self.neighbors.add(info.get("Matric_No") or parsed_digest, df, info.get("Name"))
+                    self._neighbors_dirty = True
+                with self._lock:
+                    self.parsed += 1
+                    self._done_times.append(time.time())
+                log.info("ingested %s (%d courses)", name, len(df))
+            except Exception as e:
+                self.store.record_failure(digest, name, str(e) or type(e).__name__)
+                with self._lock:
+                    self.failed += 1
+                    self._done_times.append(time.time())
+                log.warning("failed %s: %s", name, e)
+            self._queued.discard(digest)
+
+    def run(self) -> None:
+        """Scan, submit and collect until stop() is called, then drain in-flight work."""
+        next_scan = 0.0
+        while not self._stop.is_set():
+            if time.time() >= next_scan:
+                self.save_neighbors()
+                queued = self.scan()
+                if queued:
+                    log.info("queued %d new file(s)", queued)
+                next_scan = time.time() + self.interval_s
+            self.pump()
+            self.collect(timeout=max(0.1, min(1.0, next_scan - time.time())))
+        while self.in_flight:
+            self.collect(timeout=1.0)
+        self.pool.shutdown()
+        self.save_neighbors()
+
+    def save_neighbors(self) -> None:
+        """Persist the neighbour index if students were added since the last save."""
+        if self.neighbors is not None and self._neighbors_dirty:
+            self.neighbors.save(self.neighbors_path)
+            self._neighbors_dirty = False
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---------------------------------------------------------------
+    # Metrics
+    # ---------------------------------------------------------------
+    def metrics(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            while self._done_times and now - self._done_times[0] > 60:
+                self._done_times.popleft()
+            elapsed = now - self.started
+            return {
+                "uptime_s": round(elapsed, 1),
+                "queue_depth": len(self.pending),
+                "in_flight": len(self.in_flight),
+                "capacity": self.capacity,
+                "parsed": self.parsed,
+                "failed": self.failed,
+                "duplicates": self.duplicates,
+                "pool_restarts": self.pool_restarts,
+                "files_per_min_last_min": len(self._done_times),
+                "files_per_min_overall": round((self.parsed + self.failed) / elapsed * 60, 2) if elapsed else 0.0,
+            }
+
+
+def serve_metrics(daemon: IngestDaemon, host: str, port: int) -> ThreadingHTTPServer:
+    """Serve GET /metrics as JSON from a background thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = json.dumps(daemon.metrics()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="ingest-metrics").start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch a directory and ingest transcript PDFs")
+    parser.add_argument("watch_dir")
+    parser.add_argument("--store", default="ingest.db", help="SQLite file for results and progress")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--queue-limit", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between scans")
+    parser.add_argument("--settle", type=float, default=2.0, help="Skip files modified within this many seconds")
+    parser.add_argument("--neighbors", help="Also maintain a student neighbour index (.npz) at this path")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--metrics-port", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    store = IngestStore(args.store)
+    daemon = IngestDaemon(
+        args.watch_dir, store, args.workers, args.queue_limit, args.interval, args.settle, args.neighbors
+    )
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    if args.metrics_port:
+        serve_metrics(daemon, args.metrics_host, args.metrics_port)
+        log.info("metrics on http://%s:%d/metrics", args.metrics_host, args.metrics_port)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+        daemon.run()  # drain in-flight parses before exiting
+    finally:
+        store.close()
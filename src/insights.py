@@ -0,0 +1,146 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Tuple
+
+from src.analyzer import overall_gpa
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.similarity import CourseIndex
+
+# UNILAG degree classes on the 5.0 scale, highest first
+DEGREE_CLASSES: List[Tuple[str, float]] = [
+    ("First Class", 4.50),
+    ("Second Class Upper", 3.50),
+    ("Second Class Lower", 2.40),
+    ("Third Class", 1.50),
+    ("Pass", 1.00),
+]
+
+TREND_THRESHOLD = 0.15  # GPA change per year below which performance counts as steady
+
+
+@dataclass
+class Insight:
+    """
+    One fact about a transcript, computed without the LLM.
+
+    Attributes:
+        kind: Stable identifier (e.g. "trend", "weak_areas")
+        title: Short heading
+        detail: One or two sentences of Markdown
+        tone: "good", "bad" or "neutral"
+    """
+    kind: str
+    title: str
+    detail: str
+    tone: str = "neutral"
+
+
+def _course_list(rows: pd.DataFrame) -> str:
+    return ", ".join(f"{r.Course_Code} {r.Course_Title} ({r.Grade})" for r in rows.itertuples())
+
+
+def degree_class(gpa: float) -> Tuple[str, str | None, float | None]:
+    """Current class, the next class up and the GPA still needed to reach it."""
+    for i, (name, floor) in enumerate(DEGREE_CLASSES):
+        if gpa >= floor:
+            if i == 0:
+                return name, None, None
+            above, above_floor = DEGREE_CLASSES[i - 1]
+            return name, above, round(above_floor - gpa, 2)
+    return "Below Pass", DEGREE_CLASSES[-1][0], round(DEGREE_CLASSES[-1][1] - gpa, 2)
+
+
+def _year_gpas(df: pd.DataFrame) -> pd.Series:
+    by_year = df.dropna(subset=["Year"]).groupby("Year")[["Credit_Value", "Credit_Unit"]].sum()
+    return (by_year["Credit_Value"] / by_year["Credit_Unit"]).round(2)
+
+
+def compute_insights(df: pd.DataFrame, index: CourseIndex | None = None) -> List[Insight]:
+    """
+    Rule-based facts about one transcript, in display order.
+
+    Covers standing and degree class, best and worst courses, the
+    year-over-year trend, related-course groups that are consistently
+    strong or weak, and failed courses with whether they were retaken.
+
+    Args:
+        df: DataFrame with course information
+        index: Course-title index for grouping related courses (defaults as
+            in analyzer.top_course_groups)
+
+    Returns:
+        List of Insight
+    """
+    from src.similarity import CourseIndex, get_course_index
+
+    insights: List[Insight] = []
+    if df.empty:
+        return insights
+
+    gpa = overall_gpa(df)
+    current, above, gap = degree_class(gpa)
+    detail = f"Overall GPA **{gpa}/5.0** over {int(df['Credit_Unit'].sum())} credit units."
+    if above:
+        detail += f" {gap:.2f} points below {above}."
+    insights.append(Insight("standing", current, detail, "good" if gpa >= 3.5 else "bad" if gpa < 2.4 else "neutral"))
+
+    ranked = df.sort_values(["Grade_Point", "Credit_Unit"], ascending=[False, False])
+    insights.append(Insight("best", "Best courses", _course_list(ranked.head(3)), "good"))
+    worst = df.sort_values(["Grade_Point", "Credit_Unit"], ascending=[True, False]).head(3)
+    if worst["Grade_Point"].min() < ranked["Grade_Point"].max():
+        insights.append(Insight("worst", "Hardest courses", _course_list(worst), "bad"))
+
+    years = _year_gpas(df)
+    if len(years) >= 2:
+        slope = (years.iloc[-1] - years.iloc[0]) / (years.index[-1] - years.index[0])
+        path = " → ".join(f"Y{int(y)} {g:.2f}" for y, g in years.items())
+        changes = years.diff().dropna()
+        biggest = changes.abs().idxmax()
+        if slope >= TREND_THRESHOLD:
+            title, tone = "Improving year on year", "good"
+        elif slope <= -TREND_THRESHOLD:
+            title, tone = "Declining year on year", "bad"
+        else:
+            title, tone = "Steady across years", "neutral"
+        detail = f"{path}. Largest change: {changes[biggest]:+.2f} into year {int(biggest)}."
+        insights.append(Insight("trend", title, detail, tone))
+
+    index = index or get_course_index() or CourseIndex.from_frame(df)
+    groups = df.assign(Group=df["Course_Title"].map(index.group_of))
+    summary = groups.groupby("Group").agg(
+        Courses=("Course_Code", "size"),
+        Mean=("Grade_Point", "mean"),
+        Years=("Year", "nunique"),
+        Codes=("Course_Code", lambda s: ", ".join(sorted(set(s.str[:3])))),
+    )
+    summary = summary[summary["Courses"] >= 2]
+    weak = summary[summary["Mean"] < 3.0].sort_values("Mean")
+    strong = summary[summary["Mean"] >= 4.0].sort_values("Mean", ascending=False)
+    if not strong.empty:
+        insights.append(Insight("strong_areas", "Consistently strong areas", "; ".join(
+            f"{g} ({r.Codes}): {r.Mean:.2f} over {r.Courses} courses" for g, r in strong.head(3).iterrows()
+        ), "good"))
+    if not weak.empty:
+        insights.append(Insight("weak_areas", "Consistently weak areas", "; ".join(
+            f"{g} ({r.Codes}): {r.Mean:.2f} over {r.Courses} courses"
+            + (f" in {r.Years} different years" if r.Years > 1 else "")
+            for g, r in weak.head(3).iterrows()
+        ), "bad"))
+
+    failed = df[df["Grade_Point"] == 0]
+    if not failed.empty:
+        passed = set(df.loc[df["Grade_Point"] > 0, "Course_Code"])
+        outstanding = sorted(set(failed["Course_Code"]) - passed)
+        detail = f"{len(failed)} failed result(s): {', '.join(sorted(set(failed['Course_Code'])))}."
+        detail += f" Not yet passed: {', '.join(outstanding)}." if outstanding else " All since passed on retake."
+        insights.append(Insight("failed", "Failed courses", detail, "bad" if outstanding else "neutral"))
+
+    return insights
+
+
+def insights_markdown(insights: List[Insight]) -> str:
+    """Render insights as a Markdown bullet list."""
+    marks = {"good": "🟢", "bad": "🔴", "neutral": "⚪"}
+    return "\n".join(f"- {marks.get(i.tone, '⚪')} **{i.title}** — {i.detail}" for i in insights)
@@ -0,0 +1,312 @@
+"""
+Load-test the parse and advise paths with N simulated users.
+
+Each simulated session uploads a transcript, views its stats and asks for
+one or more advisor sections, with think time between steps. The LLM is
+replaced by the deterministic FakeBackend, so runs need no network.
+
+    # In-process, the way one Streamlit worker runs it
+    python -m src.loadtest --users 1,2,4,8,16 --pdf-dir data/
+
+    # Against the HTTP service (start it with ADVISOR_BACKEND=fake)
+    python -m src.loadtest --url http://127.0.0.1:8000 --users 1,4,16,64
+
+Without --pdf-dir, synthetic transcript PDFs are generated (this needs
+reportlab), so the upload stage still exercises the PDF parser. The
+--llm-* options configure the in-process fake LLM; with --url, start the
+service with ADVISOR_BACKEND=fake and the FAKE_LLM_* settings instead.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from src.advisor import REPORT_SECTIONS
+
+STAGES = ("upload", "stats", "advise")
+
+GRADES = [("A", 5.0), ("B", 4.0), ("C", 3.0), ("D", 2.0), ("E", 1.0), ("F", 0.0)]
+SUBJECTS = ["CSC", "MTH", "STA", "PHY", "GST", "EEG", "ECO", "ACC"]
+
+
+def synthetic_courses(seed: int, n_courses: int = 48) -> Tuple[List[Dict], Dict]:
+    """A plausible four-year course list and student_info for one fake student."""
+    rng = random.Random(seed)
+    matric = f"LT{seed:07d}"
+    info = {"Name": f"Student {seed}", "Matric_No": matric, "Faculty": "SCIENCE", "Department": "COMPUTER SCIENCE"}
+    courses = []
+    for i in range(n_courses):
+        year = i * 4 // n_courses + 1
+        grade, point = rng.choices(GRADES, weights=[3, 4, 3, 2, 1, 1])[0]
+        units = rng.choice([2, 3, 3, 4])
+        subject = rng.choice(SUBJECTS)
+        courses.append({
+            "Name": info["Name"],
+            "Matric_No": matric,
+            "Session": f"{2018 + year}/{2019 + year}",
+            "Year": year,
+            "Course_Code": f"{subject}{year}{i % 10}{rng.randint(0, 9)}",
+            "Course_Title": f"{subject} Topic {i}",
+            "Credit_Unit": units,
+            "Grade": grade,
+            "Grade_Point": point,
+            "Credit_Value": units * point,
+        })
+    return courses, info
+
+
+def synthetic_pdf(seed: int, n_courses: int = 48) -> bytes:
+    """synthetic_courses() rendered as a transcript PDF the parser can read."""
+    import io
+    from reportlab.pdfgen import canvas
+
+    courses, info = synthetic_courses(seed, n_courses)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(595, 842))
+    y = 800
+    for label, key in (("NAME", "Name"), ("MATRIC NO", "Matric_No"), ("FACULTY", "Faculty"), ("DEPARTMENT", "Department")):
+        c.drawString(50, y, f"{label}: {info[key]}")
+        y -= 16
+    for year in sorted({row["Year"] for row in courses}):
+        if year > 1:
+            c.showPage()
+            y = 800
+        session = next(row["Session"] for row in courses if row["Year"] == year)
+        c.drawString(50, y, f"SESSION: {session}  YEAR: {year}")
+        y -= 16
+        for row in courses:
+            if row["Year"] != year:
+                continue
+            c.drawString(50, y, row["Course_Code"])
+            c.drawString(120, y, row["Course_Title"])
+            c.drawString(400, y, str(row["Credit_Unit"]))
+            c.drawString(450, y, row["Grade"])
+            c.drawString(500, y, f"{row['Grade_Point']:.1f}")
+            y -= 16
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+class Rejected(Exception):
+    """The target shed load (HTTP 503)."""
+
+
+class LibraryTarget:
+    """Call the library in-process, as one Streamlit worker would."""
+
+    def __init__(self, pdfs: List[bytes]):
+        self.pdfs = pdfs
+
+    def upload(self, seed: int):
+        import io
+        from src.parser import parse_transcript
+
+        return parse_transcript(io.BytesIO(self.pdfs[seed % len(self.pdfs)]))
+
+    def stats(self, handle):
+        from src.parser import get_quick_stats
+
+        return get_quick_stats(handle[0])
+
+    def advise(self, handle, section: str):
+        from src.advisor import generate_section
+
+        return generate_section(section, handle[0], handle[1])
+
+
+class HttpTarget:
+    """Call the HTTP service from src.service."""
+
+    def __init__(self, base_url: str, pdfs: List[bytes], timeout_s: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.pdfs = pdfs
+        self.timeout_s = timeout_s
+
+    def _post(self, path: str, body: bytes, content_type: str) -> Dict:
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method="POST", headers={"Content-Type": content_type}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout_s) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code == 503:
+                raise Rejected() from e
+            raise
+
+    def upload(self, seed: int):
+        data = self._post("/parse", self.pdfs[seed % len(self.pdfs)], "application/pdf")
+        return {"courses": data["courses"], "student_info": data["student_info"]}
+
+    def stats(self, handle):
+        return self._post("/stats", json.dumps(handle).encode(), "application/json")
+
+    def advise(self, handle, section: str):
+        return self._post(f"/advise?section={section}", json.dumps(handle).encode(), "application/json")
+
+
+@dataclass
+class StepResult:
+    users: int
+    duration_s: float = 0.0
+    sessions: int = 0
+    errors: int = 0
+    rejected: int = 0
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: {stage: [] for stage in STAGES})
+
+    @property
+    def throughput(self) -> float:
+        """Completed sessions per second."""
+        return self.sessions / self.duration_s if self.duration_s else 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_step(target, users: int, sessions_per_user: int, max_sections: int, think_s: float, seed: int = 0) -> StepResult:
+    """Run `users` concurrent simulated users, each doing `sessions_per_user` sessions."""
+    result = StepResult(users)
+    lock = threading.Lock()
+
+    def record(stage: str, seconds: float) -> None:
+        with lock:
+            result.latencies[stage].append(seconds)
+
+    def user(uid: int) -> None:
+        rng = random.Random(seed * 100003 + uid)
+        for s in range(sessions_per_user):
+            try:
+                start = time.perf_counter()
+                handle = target.upload(uid * sessions_per_user + s)
+                record("upload", time.perf_counter() - start)
+                time.sleep(rng.uniform(0, think_s))
+
+                start = time.perf_counter()
+                target.stats(handle)
+                record("stats", time.perf_counter() - start)
+
+                for section in rng.sample(REPORT_SECTIONS, rng.randint(1, max_sections)):
+                    time.sleep(rng.uniform(0, think_s))
+                    start = time.perf_counter()
+                    target.advise(handle, section)
+                    record("advise", time.perf_counter() - start)
+            except Rejected:
+                with lock:
+                    result.rejected += 1
+                continue
+            except Exception:
+                with lock:
+                    result.errors += 1
+                continue
+            with lock:
+                result.sessions += 1
+
+    threads = [threading.Thread(target=user, args=(uid,), daemon=True) for uid in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    result.duration_s = time.perf_counter() - start
+    return result
+
+
+def find_saturation(results: List[StepResult], min_gain: float = 0.10) -> int | None:
+    """
+    User count where adding users stopped paying off.
+
+    That is the last step before throughput grew by less than `min_gain`
+    (relative) while user count went up. None if throughput never levelled off.
+    """
+    for prev, cur in zip(results, results[1:]):
+        if prev.throughput and cur.throughput < prev.throughput * (1 + min_gain):
+            return prev.users
+    return None
+
+
+def report(results: List[StepResult]) -> None:
+    header = f"{'users':>5} {'sess/s':>7} {'ok':>5} {'err':>4} {'shed':>4}"
+    for stage in STAGES:
+        header += f" | {stage + ' p50/p95/p99 (s)':>27}"
+    print(header)
+    for r in results:
+        line = f"{r.users:>5} {r.throughput:>7.2f} {r.sessions:>5} {r.errors:>4} {r.rejected:>4}"
+        for stage in STAGES:
+            v = r.latencies[stage]
+            line += f" | {percentile(v, .5):>8.3f} {percentile(v, .95):>8.3f} {percentile(v, .99):>8.3f}"
+        print(line)
+    saturation = find_saturation(results)
+    if saturation is None:
+        print("\nNo saturation reached; try more users.")
+    else:
+        print(f"\nSaturation at ~{saturation} concurrent users "
+              f"(peak {max(r.throughput for r in results):.2f} sessions/s).")
+
+
+def _load_pdfs(pdf_dir: str) -> List[bytes]:
+    pdfs = []
+    for name in sorted(os.listdir(pdf_dir)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(pdf_dir, name), "rb") as f:
+                pdfs.append(f.read())
+    return pdfs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test parse and advise paths")
+    parser.add_argument("--url", help="Service base URL; omit to run in-process")
+    parser.add_argument("--pdf-dir", help="Directory of transcript PDFs to replay")
+    parser.add_argument("--users", default="1,2,4,8,16,32", help="Comma-separated user counts to ramp through")
+    parser.add_argument("--sessions", type=int, default=3, help="Sessions per user per step")
+    parser.add_argument("--max-sections", type=int, default=2, help="Advisor sections per session (1-4)")
+    parser.add_argument("--think", type=float, default=0.5, help="Max think time between steps, seconds")
+    parser.add_argument("--synthetic", type=int, default=16, help="Synthetic PDFs to generate without --pdf-dir")
+    parser.add_argument("--llm-latency-ms", type=float, default=None, help="Fake LLM median latency (in-process only)")
+    parser.add_argument("--llm-error-rate", type=float, default=None, help="Fake LLM error rate (in-process only)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.url and (args.llm_latency_ms is not None or args.llm_error_rate is not None):
+        parser.error("--llm-* options configure the in-process fake LLM; with --url, "
+                     "set FAKE_LLM_* on the service instead")
+    if args.pdf_dir:
+        pdfs = _load_pdfs(args.pdf_dir)
+        if not pdfs:
+            parser.error(f"No PDFs in {args.pdf_dir}")
+    else:
+        try:
+            pdfs = [synthetic_pdf(args.seed * 100003 + i) for i in range(max(args.synthetic, 1))]
+        except ImportError:
+            parser.error("Synthetic transcripts need reportlab (pip install reportlab); or pass --pdf-dir")
+    if args.url:
+        target = HttpTarget(args.url, pdfs)
+    else:
+        from src.backends import FakeBackend, resilient_from_env, set_backend
+
+        set_backend(resilient_from_env(FakeBackend(
+            latency_ms=800.0 if args.llm_latency_ms is None else args.llm_latency_ms,
+            error_rate=args.llm_error_rate or 0.0,
+            seed=args.seed,
+        )))
+        target = LibraryTarget(pdfs)
+
+    results = []
+    for users in (int(u) for u in args.users.split(",")):
+        step = run_step(target, users, args.sessions, min(max(args.max_sections, 1), 4), args.think, args.seed)
+        results.append(step)
+        print(f"{users} users: {step.throughput:.2f} sessions/s, "
+              f"advise p95 {percentile(step.latencies['advise'], .95):.3f}s", flush=True)
+    print()
+    report(results)
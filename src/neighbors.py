@@ -0,0 +1,337 @@
+"""
+Nearest-neighbour search over students' grade profiles.
+
+Each student is a fixed-length vector over the Course_Code vocabulary:
+grade point minus 2.5 for courses taken (so an A pulls one way and an F
+the other), zero for courses not taken. Cosine similarity then rewards
+students who took the same courses and did similarly in them.
+
+    python -m src.neighbors build neighbors.npz --db ingest.db
+    python -m src.neighbors query neighbors.npz 170805001
+
+Point NEIGHBOR_INDEX_PATH at the file to show similar students in the app.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Midpoint of the 5.0 grade-point scale. No grade point equals it, so a zero
+# cell always means "not taken".
+CENTRE = 2.5
+
+
+@dataclass
+class Neighbor:
+    """One similar student."""
+    student_id: str
+    name: str | None
+    score: float
+    gpa: float
+    shared_courses: int
+
+
+def _profile(df: pd.DataFrame) -> Tuple[Dict[str, float], float]:
+    """Centred mean grade point per course code, and credit-weighted GPA."""
+    points = df.groupby("Course_Code")["Grade_Point"].mean() - CENTRE
+    credits = df["Credit_Unit"].sum()
+    gpa = float((df["Credit_Unit"] * df["Grade_Point"]).sum() / credits) if credits else 0.0
+    return points.to_dict(), gpa
+
+
+class _Postings:
+    """Growable (student row, value) arrays for one course code."""
+    __slots__ = ("rows", "values", "size")
+
+    def __init__(self):
+        self.rows = np.empty(8, dtype=np.int32)
+        self.values = np.empty(8, dtype=np.float32)
+        self.size = 0
+
+    def append(self, row: int, value: float) -> None:
+        if self.size == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.empty(self.size, np.int32)])
+            self.values = np.concatenate([self.values, np.empty(self.size, np.float32)])
+        self.rows[self.size] = row
+        self.values[self.size] = value
+        self.size += 1
+
+    def remove(self, row: int) -> None:
+        keep = self.rows[:self.size] != row
+        kept = int(keep.sum())
+        self.rows[:kept] = self.rows[:self.size][keep]
+        self.values[:kept] = self.values[:self.size][keep]
+        self.size = kept
+
+
+class NeighborIndex:
+    """
+    Sparse student-by-course matrix with cosine top-k search.
+
+    Every student's row is kept (course columns and values), and so is every
+    course's column (student rows and values) as a growable posting list,
+    so inserting a student costs O(courses taken). A query gathers the
+    posting lists of the courses the query student took and sums them per
+    student with one np.bincount; a batch of queries does the same in a
+    single bincount over (query, student) pairs. Work is proportional to
+    how many students share courses with the query, not to cohort size
+    times vocabulary.
+    """
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.names: List[str | None] = []
+        self.rows: Dict[str, int] = {}
+        self._row_cols: List[np.ndarray] = []
+        self._row_values: List[np.ndarray] = []
+        self._postings: List[_Postings] = []
+        self._norms = np.zeros(1024, dtype=np.float32)
+        self._gpas = np.zeros(1024, dtype=np.float32)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------------------------------------------------------------
+    # Insertion
+    # ---------------------------------------------------------------
+    def _insert(self, student_id: str, name: str | None, cols: np.ndarray, values: np.ndarray, gpa: float) -> None:
+        # Caller holds the lock
+        row = self.rows.get(student_id)
+        if row is None:
+            row = self.rows[student_id] = len(self.ids)
+            self.ids.append(student_id)
+            self.names.append(name)
+            self._row_cols.append(cols)
+            self._row_values.append(values)
+            if row == len(self._norms):
+                self._norms = np.concatenate([self._norms, np.zeros(row, np.float32)])
+                self._gpas = np.concatenate([self._gpas, np.zeros(row, np.float32)])
+        else:
+            for col in self._row_cols[row].tolist():
+                self._postings[col].remove(row)
+            self.names[row] = name or self.names[row]
+            self._row_cols[row], self._row_values[row] = cols, values
+        for col, value in zip(cols.tolist(), values.tolist()):
+            self._postings[col].append(row, value)
+        self._norms[row] = np.linalg.norm(values)
+        self._gpas[row] = gpa
+
+    def add(self, student_id: str, df: pd.DataFrame, name: str | None = None) -> None:
+        """
+        Insert a student, or replace their row if already present.
+
+        Args:
+            student_id: Matric number or other stable id
+            df: That student's course rows
+            name: Display name
+        """
+        points, gpa = _profile(df)
+        with self._lock:
+            for code in points:
+                if code not in self.codes:
+                    self.codes[code] = len(self.codes)
+                    self._postings.append(_Postings())
+            cols = np.fromiter((self.codes[c] for c in points), dtype=np.int32, count=len(points))
+            values = np.fromiter(points.values(), dtype=np.float32, count=len(points))
+            self._insert(student_id, name, cols, values, gpa)
+
+    def add_cohort(self, cohort: pd.DataFrame) -> None:
+        """Insert every student in concatenated course rows, keyed by Matric_No."""
+        for student_id, rows in cohort.groupby("Matric_No", sort=False):
+            self.add(str(student_id), rows, rows["Name"].iloc[0] if "Name" in rows else None)
+
+    # ---------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------
+    def _query_vector(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        points, _ = _profile(df)
+        known = [(self.codes[c], v) for c, v in points.items() if c in self.codes]
+        cols = np.array([c for c, _ in known], dtype=np.int64)
+        values = np.array([v for _, v in known], dtype=np.float32)
+        return cols, values
+
+    def query_many(self, frames: Iterable[pd.DataFrame], k: int = 10, exclude: Iterable[str | None] = ()) -> List[List[Neighbor]]:
+        """
+        Top-k most similar students for each of several transcripts.
+
+        Args:
+            frames: Course rows of each query student
+            k: Neighbours per query
+            exclude: Student id to leave out of each query's results (usually itself)
+
+        Returns:
+            One list of Neighbor per query, most similar first
+        """
+        frames = list(frames)
+        exclude = list(exclude) or [None] * len(frames)
+        with self._lock:
+            n = len(self.ids)
+            if n == 0:
+                return [[] for _ in frames]
+            # Flatten every (query, course) posting list into one set of arrays
+            slots, rows, contrib = [], [], []
+            q_norms = np.zeros(len(frames), dtype=np.float32)
+            for i, df in enumerate(frames):
+                cols, values = self._query_vector(df)
+                q_norms[i] = np.linalg.norm(values) if len(values) else 0.0
+                for col, value in zip(cols.tolist(), values.tolist()):
+                    postings = self._postings[col]
+                    slots.append(np.full(postings.size, i * n, dtype=np.int64))
+                    rows.append(postings.rows[:postings.size])
+                    contrib.append(postings.values[:postings.size] * value)
+            if not rows:
+                return [[] for _ in frames]
+            flat = np.concatenate(slots) + np.concatenate(rows)
+            dots = np.bincount(flat, weights=np.concatenate(contrib), minlength=len(frames) * n).reshape(len(frames), n)
+            shared = np.bincount(flat, minlength=len(frames) * n).reshape(len(frames), n)
+            denom = q_norms[:, None] * self._norms[:n][None, :]
+            scores = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+            results = []
+            for i, skip in enumerate(exclude):
+                row_scores = scores[i]
+                if skip is not None and skip in self.rows:
+                    row_scores[self.rows[skip]] = -np.inf
+                kk = min(k, n)
+                top = np.argpartition(-row_scores, kk - 1)[:kk]
+                top = top[np.argsort(-row_scores[top])]
+                results.append([
+                    Neighbor(self.ids[j], self.names[j], round(float(row_scores[j]), 3),
+                             round(float(self._gpas[j]), 2), int(shared[i, j]))
+                    for j in top if np.isfinite(row_scores[j]) and row_scores[j] > 0
+                ])
+            return results
+
+    def query(self, df: pd.DataFrame, k: int = 10, exclude: str | None = None) -> List[Neighbor]:
+        """Top-k most similar students to one transcript."""
+        return self.query_many([df], k, [exclude])[0]
+
+    def outlook(self, df: pd.DataFrame, k: int = 20, exclude: str | None = None, n: int = 5) -> Dict:
+        """
+        How similar students did: their GPAs, and the courses this student
+        has not taken yet that they did best and worst in.
+
+        Returns:
+            Dict with neighbors, mean_gpa, strong_ahead and weak_ahead
+            (lists of (course code, mean grade point))
+        """
+        neighbors = self.query(df, k, exclude)
+        if not neighbors:
+            return {"neighbors": [], "mean_gpa": None, "strong_ahead": [], "weak_ahead": []}
+        with self._lock:
+            rows = [self.rows[nb.student_id] for nb in neighbors]
+            cols = np.concatenate([self._row_cols[r] for r in rows])
+            values = np.concatenate([self._row_values[r] for r in rows])
+            taken = np.array([self.codes[c] for c in set(df["Course_Code"]) if c in self.codes], dtype=np.int64)
+            ahead = ~np.isin(cols, taken)
+            counts = np.bincount(cols[ahead], minlength=len(self.codes))
+            sums = np.bincount(cols[ahead], weights=values[ahead], minlength=len(self.codes))
+            code_of = list(self.codes)
+        # Only courses enough neighbours took to say something
+        common = np.flatnonzero(counts >= max(2, len(rows) // 4))
+        means = sums[common] / counts[common] + CENTRE
+        order = np.argsort(-means, kind="stable")
+        pairs = [(code_of[int(common[j])], round(float(means[j]), 2)) for j in order]
+        return {
+            "neighbors": neighbors,
+            "mean_gpa": round(float(np.mean([nb.gpa for nb in neighbors])), 2),
+            "strong_ahead": pairs[:n],
+            "weak_ahead": pairs[::-1][:n],
+        }
+
+    # ---------------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------------
+    def save(self, path: str) -> None:
+        """Write the rows as CSR arrays; posting lists are rebuilt on load."""
+        with self._lock:
+            n = len(self.ids)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    indptr=np.concatenate([[0], np.cumsum([len(c) for c in self._row_cols])]).astype(np.int64),
+                    cols=np.concatenate(self._row_cols + [np.empty(0, np.int32)]),
+                    values=np.concatenate(self._row_values + [np.empty(0, np.float32)]),
+                    gpas=self._gpas[:n],
+                    meta=np.array(json.dumps({"ids": self.ids, "names": self.names, "codes": list(self.codes)})),
+                )
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> NeighborIndex:
+        with np.load(path, allow_pickle=False) as f:
+            indptr, cols, values, gpas = f["indptr"], f["cols"], f["values"], f["gpas"]
+            meta = json.loads(str(f["meta"]))
+        index = cls()
+        index.codes = {code: i for i, code in enumerate(meta["codes"])}
+        index._postings = [_Postings() for _ in meta["codes"]]
+        with index._lock:
+            for row, (student_id, name) in enumerate(zip(meta["ids"], meta["names"])):
+                start, end = indptr[row], indptr[row + 1]
+                index._insert(student_id, name, cols[start:end], values[start:end], float(gpas[row]))
+        return index
+
+
+_index: NeighborIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_neighbor_index() -> NeighborIndex | None:
+    """Cohort index from NEIGHBOR_INDEX_PATH, loaded on first use (None if unset or missing)."""
+    global _index
+    path = os.getenv("NEIGHBOR_INDEX_PATH")
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None and os.path.exists(path):
+            _index = NeighborIndex.load(path)
+        return _index
+
+
+def _cohort_from_db(path: str) -> pd.DataFrame:
+    import sqlite3
+    import pandas as pd
+
+    with sqlite3.connect(path) as conn:
+        return pd.read_sql_query(
+            'SELECT "Matric_No", "Name", "Course_Code", "Credit_Unit", "Grade_Point" FROM courses', conn
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Students with similar grade profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build an index from the ingestion store and save it")
+    build.add_argument("out", help="Output .npz path")
+    build.add_argument("--db", required=True, help="Ingestion store (see src.ingest)")
+    query = sub.add_parser("query", help="Students most like one already in the index")
+    query.add_argument("index")
+    query.add_argument("student_id")
+    query.add_argument("--db", help="Ingestion store to read the student's courses from")
+    query.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = NeighborIndex()
+        index.add_cohort(_cohort_from_db(args.db))
+        index.save(args.out)
+        print(f"Indexed {len(index)} students over {len(index.codes)} courses -> {args.out}")
+    else:
+        index = NeighborIndex.load(args.index)
+        if not args.db:
+            parser.error("query needs --db to read the student's courses")
+        cohort = _cohort_from_db(args.db)
+        rows = cohort[cohort["Matric_No"] == args.student_id]
+        for nb in index.query(rows, args.k, exclude=args.student_id):
+            print(f"{nb.score:.3f}  {nb.student_id:<14} GPA {nb.gpa:.2f}  {nb.shared_courses:>3} shared  {nb.name or ''}")
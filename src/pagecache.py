@@ -0,0 +1,97 @@
+from __future__ import annotations
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from src.parser import PageRead, TableLayout
+from src.templates import font_names
+
+
+def _content_streams(page) -> List[bytes]:
+    """Decoded content streams of a page, plus those of the form XObjects it draws."""
+    from pdfminer.pdftypes import resolve1
+
+    data = [resolve1(stream).get_data() for stream in page.page_obj.contents or []]
+    resources = resolve1(page.page_obj.resources) or {}
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for ref in xobjects.values():
+        xobject = resolve1(ref)
+        subtype = getattr(xobject, "get", lambda _: None)("Subtype")
+        if getattr(subtype, "name", None) == "Form":
+            data.append(xobject.get_data())
+    return data
+
+
+def page_key(page, layout: TableLayout, session_pattern: re.Pattern) -> str:
+    """
+    Identity of one page's extraction result.
+
+    Hashes the page's drawing instructions, size and fonts together with
+    the layout and session pattern it would be read with, so an unchanged
+    page carried over into a longer transcript gets the same key.
+    """
+    h = hashlib.sha256()
+    h.update(repr((vars(layout), session_pattern.pattern, round(page.width, 1), round(page.height, 1))).encode("utf-8"))
+    h.update("|".join(font_names(page)).encode("utf-8"))
+    for data in _content_streams(page):
+        h.update(data)
+    return h.hexdigest()
+
+
+class PageCache:
+    """Per-page extraction results keyed by page_key, in LRU order."""
+
+    def __init__(self, max_pages: int = 4096):
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[str, PageRead]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> PageRead | None:
+        with self._lock:
+            read = self._pages.get(key)
+            if read is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return read
+
+    def put(self, key: str, read: PageRead) -> None:
+        with self._lock:
+            self._pages[key] = read
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "pages": len(self._pages),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self.hits = self.misses = 0
+
+
+_page_cache: PageCache | None = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    """Process-wide page cache, sized from PAGE_CACHE_ENTRIES on first use."""
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(int(os.getenv("PAGE_CACHE_ENTRIES", "4096")))
+        return _page_cache
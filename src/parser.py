@@ -1,66 +1,416 @@
-import pdfplumber
-import pandas as pd
+from __future__ import annotations
+import hashlib
 import re
-from typing import Tuple, Dict
+from dataclasses import dataclass
+from statistics import median
+from typing import IO, TYPE_CHECKING, List, Tuple, Dict, Union
 
-def parse_transcript(pdf_path: str) -> Tuple[pd.DataFrame, Dict]:
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.pagecache import PageCache
+    from src.templates import ExtractionPlan, TemplateRegistry
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of a transcript file's bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+# Label variants seen across faculties and print runs; the first of each is
+# the original UNILAG layout. Extraction plans pick one per field.
+HEADER_VARIANTS = {
+    "Name": [re.compile(r"NAME:\s*(.+)"), re.compile(r"NAME OF STUDENT:\s*(.+)")],
+    "Matric_No": [re.compile(r"MATRIC NO:\s*(.+)"), re.compile(r"MATRIC(?:ULATION)?\.?\s*N(?:O|UMBER)\.?:\s*(.+)")],
+    "Faculty": [re.compile(r"FACULTY:\s*(.+)"), re.compile(r"FACULTY OF\s+(.+)")],
+    "Department": [re.compile(r"DEPARTMENT:\s*(.+)"), re.compile(r"DEPT\.?:\s*(.+)"), re.compile(r"DEPARTMENT OF\s+(.+)")],
+    "Sex": [re.compile(r"SEX:\s*(.+)"), re.compile(r"GENDER:\s*(.+)")],
+    "DOB": [re.compile(r"DATE OF BIRTH:\s*(.+)"), re.compile(r"D\.?O\.?B\.?:\s*(.+)")],
+    "Year_of_Award": [re.compile(r"YEAR OF AWARD:\s*(.+)"), re.compile(r"YEAR OF GRADUATION:\s*(.+)")],
+}
+HEADER_FIELDS = {field: variants[0] for field, variants in HEADER_VARIANTS.items()}
+
+SESSION_VARIANTS = [
+    re.compile(r"SESSION:\s*(\d{4}/\d{4}).*YEAR:\s*(\d+)"),
+    # "2019/2020 SESSION ... 100 LEVEL" -> year 1
+    re.compile(r"(\d{4}/\d{4})\s+SESSION.*?(\d)00\s*LEVEL"),
+]
+SESSION_PATTERN = SESSION_VARIANTS[0]
+COURSE_PATTERN = re.compile(r"([A-Z]{3}\d{3})\s+(.+?)\s+(\d+)\s+([A-F][+-]?)\s+([\d.]+)")
+
+# Single-word cell patterns used when reading the table by position
+CODE_WORD = re.compile(r"^[A-Z]{3}\d{3}$")
+UNITS_WORD = re.compile(r"^\d+$")
+GRADE_WORD = re.compile(r"^[A-F][+-]?$")
+POINT_WORD = re.compile(r"^\d+(\.\d+)?$")
+CODE_TOKEN = re.compile(r"\b[A-Z]{3}\d{3}\b")
+
+# Items produced per page: ("session", session, year) or
+# ("course", code, title, units, grade, point)
+Item = tuple
+
+
+@dataclass
+class TableLayout:
+    """Horizontal positions of the course table columns, in PDF points."""
+    code_x: float
+    units_x: float
+    grade_x: float
+    point_x: float
+
+    @property
+    def title_limit(self) -> float:
+        """Anything centred left of this (and right of the code) is title text."""
+        return self.units_x - (self.grade_x - self.units_x) / 2
+
+
+@dataclass
+class PageRead:
+    """
+    What one page contributes to a transcript.
+
+    Attributes:
+        items: Session and course items, in page order
+        band: (top, bottom) of the course table band in PDF points, or None
+            if the page has no table. Only the first and last table pages
+            have the text around their band extracted, for student details.
+        text: Whole-page text of a page without a band (cover or award pages)
+        code_rows: Lines carrying a course code, read or not (see ExtractionPlan.fits)
+    """
+    items: List[Item]
+    band: Tuple[float, float] | None = None
+    text: str = ""
+    code_rows: int = 0
+
+
+def _group_lines(words: List[Dict], tolerance: float = 3.0) -> List[List[Dict]]:
+    """Cluster pdfplumber words into visual lines, each sorted left to right."""
+    lines: List[List[Dict]] = []
+    for word in sorted(words, key=lambda w: (round(w["top"]), w["x0"])):
+        if lines and abs(lines[-1][0]["top"] - word["top"]) <= tolerance:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w["x0"]) for line in lines]
+
+
+def _centre(word: Dict) -> float:
+    return (word["x0"] + word["x1"]) / 2
+
+
+def _course_cells(line: List[Dict]):
+    """(code, units, grade, point) words if the line is shaped like a course row."""
+    texts = [w["text"] for w in line]
+    code = next((i for i, t in enumerate(texts) if CODE_WORD.match(t)), None)
+    if code is None or len(texts) - code < 5:
+        return None
+    units, grade, point = line[-3], line[-2], line[-1]
+    if UNITS_WORD.match(units["text"]) and GRADE_WORD.match(grade["text"]) and POINT_WORD.match(point["text"]):
+        return line[code], units, grade, point
+    return None
+
+
+def locate_table(lines: List[List[Dict]]) -> TableLayout | None:
+    """Find the course table columns from the rows that look like courses."""
+    cells = [c for c in (_course_cells(line) for line in lines) if c]
+    if not cells:
+        return None
+    return TableLayout(
+        code_x=median(c[0]["x0"] for c in cells),
+        units_x=median(_centre(c[1]) for c in cells),
+        grade_x=median(_centre(c[2]) for c in cells),
+        point_x=median(_centre(c[3]) for c in cells),
+    )
+
+
+def _row_from_layout(line: List[Dict], layout: TableLayout) -> Item | None:
+    """Read one course row by column position."""
+    code = next((w for w in line if CODE_WORD.match(w["text"]) and w["x0"] < layout.title_limit), None)
+    if code is None:
+        return None
+
+    title, columns = [], {"units": [], "grade": [], "point": []}
+    for word in line:
+        if word is code or word["x1"] <= code["x0"]:
+            continue
+        x = _centre(word)
+        if x < layout.title_limit:
+            title.append(word["text"])
+            continue
+        nearest = min(
+            (("units", layout.units_x), ("grade", layout.grade_x), ("point", layout.point_x)),
+            key=lambda col: abs(x - col[1]),
+        )[0]
+        columns[nearest].append(word["text"])
+
+    units, grade, point = (" ".join(columns[k]) for k in ("units", "grade", "point"))
+    if not (title and UNITS_WORD.match(units) and GRADE_WORD.match(grade) and POINT_WORD.match(point)):
+        return None
+    return ("course", code["text"], " ".join(title), int(units), grade, float(point))
+
+
+def _session_item(text: str, pattern: re.Pattern = SESSION_PATTERN) -> Item | None:
+    match = pattern.search(text)
+    if match:
+        return ("session", match.group(1), int(match.group(2)))
+    return None
+
+
+def _table_items(
+    lines: List[List[Dict]],
+    layout: TableLayout,
+    session_pattern: re.Pattern = SESSION_PATTERN,
+) -> Tuple[List[Item], Tuple[int, int] | None]:
+    """
+    Items from the table band of one page.
+
+    Returns:
+        The items, and the (first, last) line indices of the table band
+        (None if the page has no table)
+    """
+    items: List[Item] = []
+    first = last = None
+    for i, line in enumerate(lines):
+        if _course_cells(line) or _session_item(" ".join(w["text"] for w in line), session_pattern):
+            first = i if first is None else first
+            last = i
+    if first is None:
+        return items, None
+
+    # Letterheads above and signatures/footers below the band are never scanned
+    for line in lines[first:last + 1]:
+        row = _row_from_layout(line, layout)
+        if row is None:
+            row = _session_item(" ".join(w["text"] for w in line), session_pattern)
+        if row is not None:
+            items.append(row)
+    return items, (first, last)
+
+
+def _text_items(text: str, session_pattern: re.Pattern = SESSION_PATTERN) -> List[Item]:
+    """Fallback: whole-text line regexes, for pages without a recognisable table."""
+    items: List[Item] = []
+    for line in text.split("\n"):
+        session = _session_item(line, session_pattern)
+        if session:
+            items.append(session)
+            continue
+        match = COURSE_PATTERN.search(line)
+        if match:
+            items.append((
+                "course", match.group(1), match.group(2).strip(),
+                int(match.group(3)), match.group(4), float(match.group(5)),
+            ))
+    return items
+
+
+def _header_info(text: str, fields: Dict[str, re.Pattern] = HEADER_FIELDS) -> Dict:
+    info = {k: pattern.search(text) for k, pattern in fields.items()}
+    return {k: v.group(1).strip() if v else None for k, v in info.items()}
+
+
+def _course_records(pages: List[List[Item]], student_info: Dict) -> List[Dict]:
+    """Turn per-page items into course rows, carrying session context across pages."""
+    courses = []
+    current_session = None
+    current_year = None
+    for items in pages:
+        for item in items:
+            if item[0] == "session":
+                _, current_session, current_year = item
+                continue
+            _, code, title, units, grade, point = item
+            courses.append({
+                "Name": student_info["Name"],
+                "Matric_No": student_info['Matric_No'],
+                "Session": current_session,
+                "Year": current_year,
+                "Course_Code": code,
+                "Course_Title": title,
+                "Credit_Unit": units,
+                "Grade": grade,
+                "Grade_Point": point
+            })
+    return courses
+
+
+def _pick_variant(variants: List[re.Pattern], text: str) -> re.Pattern:
+    """The variant with the most matches in text; the first one on a tie."""
+    return max(variants, key=lambda pattern: len(pattern.findall(text)))
+
+
+def _read_page(lines: List[List[Dict]], layout: TableLayout, session_pattern: re.Pattern) -> PageRead:
+    """Items of one page read by position, plus where its table band is."""
+    items, band = _table_items(lines, layout, session_pattern)
+    code_rows = sum(1 for line in lines if any(CODE_WORD.match(w["text"]) for w in line))
+    if band is None:
+        text = "\n".join(" ".join(w["text"] for w in line) for line in lines)
+        return PageRead(items, text=text, code_rows=code_rows)
+    top = max(lines[band[0]][0]["top"] - 1, 1)
+    bottom = max(w["bottom"] for w in lines[band[1]]) + 1
+    return PageRead(items, (top, bottom), code_rows=code_rows)
+
+
+def _code_rows(text: str) -> int:
+    return sum(1 for line in text.split("\n") if CODE_TOKEN.search(line))
+
+
+def _above_band(page, band: Tuple[float, float]) -> str:
+    return page.crop((0, 0, page.width, band[0])).extract_text() or ""
+
+
+def _below_band(page, band: Tuple[float, float]) -> str:
+    if band[1] >= page.height:
+        return ""
+    return page.crop((0, band[1], page.width, page.height)).extract_text() or ""
+
+
+def _read_pages(
+    pdf,
+    plan: ExtractionPlan | None = None,
+    page_cache: PageCache | None = None,
+) -> Tuple[List[List[Item]], str, TableLayout | None, re.Pattern, int]:
+    """
+    Per-page items and student-detail text of an open pdfplumber document.
+
+    With a plan, its column layout and session pattern are used as they are.
+    Without one, the table is located on the first page that has one.
+    Pages read by position are looked up in page_cache by content hash
+    first, so only new or changed pages are extracted.
+
+    Returns:
+        Items per page, header text, the layout used (None for plain-text
+        documents), the session pattern used and the number of lines that
+        carry a course code
+    """
+    from src.pagecache import page_key
+
+    layout = plan.layout if plan else None
+    session_pattern = plan.session_pattern if plan else None
+    reads: List[PageRead | None] = []
+
+    # A plan without a layout is a plain-text template; skip word extraction
+    if plan is None or layout is not None:
+        for page in pdf.pages:
+            key = None
+            if layout is not None and page_cache is not None:
+                key = page_key(page, layout, session_pattern)
+                cached = page_cache.get(key)
+                if cached is not None:
+                    reads.append(cached)
+                    continue
+            lines = _group_lines(page.extract_words())
+            if layout is None:
+                layout = locate_table(lines)
+                if layout is None:
+                    reads.append(None)
+                    continue
+                page_text = "\n".join(" ".join(w["text"] for w in line) for line in lines)
+                session_pattern = _pick_variant(SESSION_VARIANTS, page_text)
+                if page_cache is not None:
+                    key = page_key(page, layout, session_pattern)
+            read = _read_page(lines, layout, session_pattern)
+            if key is not None:
+                page_cache.put(key, read)
+            reads.append(read)
+
+    if layout is None:
+        # No positional table anywhere; use the plain text of every page
+        text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+        session_pattern = session_pattern or _pick_variant(SESSION_VARIANTS, text)
+        return [_text_items(text, session_pattern)], text, None, session_pattern, _code_rows(text)
+
+    # Student details sit above the table on its first page and below it on its
+    # last. Pages without a table (cover sheets, award pages) follow, so a field
+    # missing around the table is still found there; the first match wins.
+    banded = [i for i, read in enumerate(reads) if read is not None and read.band]
+    header_parts = []
+    if banded:
+        first, last = banded[0], banded[-1]
+        header_parts.append(_above_band(pdf.pages[first], reads[first].band))
+        below = _below_band(pdf.pages[last], reads[last].band)
+        if below:
+            header_parts.append(below)
+
+    # Pages before the table was found are read with the text fallback.
+    # Session items stay in page order, so _course_records threads the
+    # current session across cached and freshly read pages alike.
+    pages = []
+    code_rows = 0
+    for i, read in enumerate(reads):
+        if read is None:
+            text = pdf.pages[i].extract_text() or ""
+            pages.append(_text_items(text, session_pattern))
+            header_parts.append(text)
+            code_rows += _code_rows(text)
+        else:
+            pages.append(read.items)
+            code_rows += read.code_rows
+            if not read.band:
+                header_parts.append(read.text)
+    return pages, "\n".join(header_parts), layout, session_pattern, code_rows
+
+
+def parse_transcript(
+    pdf_path: Union[str, IO[bytes]],
+    registry: TemplateRegistry | None = None,
+    page_cache: PageCache | None = None,
+) -> Tuple[pd.DataFrame, Dict]:
     """
     Parse transcript pdf and extract content
 
+    The course table is located once from word positions on the first page
+    that has one. Each page is then read only inside its table band, and
+    code, title, units, grade and point come from their column positions.
+    Student fields are read from the regions above the table on its first
+    page and below it on its last page, then from pages without a table
+    (cover and award pages) for any field still missing. Documents without
+    a recognisable table fall back to line regexes over the full text.
+
+    The column layout and the header/session patterns that fit a document
+    are kept as an extraction plan, cached under the document's template
+    fingerprint. Later documents with the same fingerprint reuse the plan
+    and skip layout detection.
+
+    Pages are cached by content hash, so re-uploading a transcript that
+    gained a semester only extracts the new pages.
+
     args:
-        pdf_path: Path to the transcript
+        pdf_path: Path to the transcript, or a binary file-like object
+        registry: Template registry to use (defaults to the shared one)
+        page_cache: Per-page result cache to use (defaults to the shared one)
 
     returns:
         Tuple of student records
     """
+    # Deferred so stats-only callers never load pdfplumber or pandas
+    import pdfplumber
+    import pandas as pd
+    from src.pagecache import get_page_cache
+    from src.templates import build_plan, fingerprint, get_registry
+
+    registry = registry if registry is not None else get_registry()
+    page_cache = page_cache if page_cache is not None else get_page_cache()
+
     with pdfplumber.open(pdf_path) as pdf:
-        # Combine all pages
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text() + "\n"
-
-        student_info = {
-            "Name": re.search(r"NAME:\s*(.+)", text),
-            "Matric_No": re.search(r"MATRIC NO:\s*(.+)", text),
-            "Faculty": re.search(r"FACULTY:\s*(.+)", text),
-            "Department": re.search(r"DEPARTMENT:\s*(.+)", text),
-            "Sex": re.search(r"SEX:/s*(.+)", text),
-            "DOB": re.search(r"DATE OF BIRTH:\s*(.+)", text),
-            "Year_of_Award": re.search(r"YEAR OF AWARD:\s*(.+)", text)  
-        }
-
-        student_info = {k: v.group(1).strip() if v else None for k, v in student_info.items()}
-
-        # parse courses with proper tracking
-        courses = []
-        current_session = None
-        current_year = None
-
-        # Split into lines to track context
-        lines = text.split("\n")
-        for line in lines:
-            session_match = re.search(r"SESSION:(\d{4}/\d{4}).*YEAR:\s*(\d+)", line)
-            if session_match:
-                current_session = session_match.group(1)
-                current_year = int(session_match.group(2))
-                continue
+        key = fingerprint(pdf)
+        plan = registry.get(key)
+        if plan is not None:
+            pages, header_text, _, _, code_rows = _read_pages(pdf, plan, page_cache)
+            student_info = _header_info(header_text, plan.header_fields)
+            if not plan.fits(pages, student_info, code_rows):
+                # Same fingerprint, different layout; detect it afresh
+                registry.discard(key)
+                plan = None
 
-            course_match = re.search(r"([A-Z]{3}\d{3})\s+(.+?)\s+(\d+)\s+([A-F][+-]?)\s+([\d.]+)", line)
-            if course_match:
-                courses.append({
-                    "Name": student_info["Name"],
-                    "Matric_No": student_info['Matric_No'],
-                    "Session": current_session,
-                    "Year": current_year,
-                    "Course_Code": course_match.group(1),
-                    "Course_Title": course_match.group(2).strip(),
-                    "Credit_Unit": int(course_match.group(3)),
-                    "Grade": course_match.group(4),
-                    "Grade_Point": float(course_match.group(5))
-                })
+        if plan is None:
+            pages, header_text, layout, session_pattern, code_rows = _read_pages(pdf, page_cache=page_cache)
+            plan = build_plan(key, layout, session_pattern, header_text)
+            student_info = _header_info(header_text, plan.header_fields)
+            if plan.fits(pages, student_info, code_rows):
+                registry.put(plan)
 
         # Create Dataframe
-        df = pd.DataFrame(courses)
+        df = pd.DataFrame(_course_records(pages, student_info))
         df['Credit_Value'] = df['Credit_Unit'] * df['Grade_Point']
 
         return df, student_info
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable
+
+from src.advisor import (
+    REPORT_SECTIONS,
+    analyze_strengths_weaknesses,
+    generate_career_pathways,
+    generate_full_report,
+    generate_project_ideas,
+    identify_skill_gaps,
+)
+from src.cache import ProfileBucketCache
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# One pool for the whole process; every session's prefetch jobs share it
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ADVISOR_PREFETCH_WORKERS", "8")),
+    thread_name_prefix="prefetch",
+)
+
+
+def _section_future(report: Future, key: str) -> Future:
+    """Future for one section of a combined-report future."""
+    section: Future = Future()
+
+    def done(f: Future) -> None:
+        if f.exception() is not None:
+            section.set_exception(f.exception())
+        else:
+            section.set_result(f.result()[key])
+
+    report.add_done_callback(done)
+    return section
+
+
+def start_prefetch(
+    df: pd.DataFrame,
+    student_info: Dict,
+    num_ideas: int = 5,
+    target_role: str | None = None,
+    cache: ProfileBucketCache | None = None,
+    combined: bool = False,
+    sections: Iterable[str] = REPORT_SECTIONS,
+) -> Dict[str, Future]:
+    """
+    Start generating every advisor output in the background.
+
+    Args:
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+        num_ideas: Number of project ideas to generate
+        target_role: Optional specific career role to target
+        cache: Optional profile-bucket cache shared between similar students
+        combined: Use one structured call for all sections instead of four
+        sections: Sections to start (e.g. only those whose inputs changed)
+
+    Returns:
+        Dictionary of futures keyed by section
+    """
+    sections = [key for key in REPORT_SECTIONS if key in set(sections)]
+    if not sections:
+        return {}
+    if combined:
+        report = _executor.submit(generate_full_report, df, student_info, num_ideas, target_role, cache)
+        return {key: _section_future(report, key) for key in sections}
+
+    jobs = {
+        "project_ideas": (generate_project_ideas, df, student_info, num_ideas, cache),
+        "career_pathways": (generate_career_pathways, df, student_info, cache),
+        "skill_gaps": (identify_skill_gaps, df, student_info, target_role, cache),
+        "detailed_analysis": (analyze_strengths_weaknesses, df, student_info, cache),
+    }
+    return {key: _executor.submit(*jobs[key]) for key in sections}
@@ -0,0 +1,367 @@
+"""
+Render an advisory report for every ingested student.
+
+Reads transcripts and stored advisor sections from the ingestion store
+(see src.ingest), draws charts as inline SVG so no browser is needed,
+and renders reports in a process pool. Each report is written in chunks
+to a temporary file and renamed into place, and recorded in a manifest,
+so an interrupted run resumes where it stopped.
+
+    python -m src.reports --db ingest.db --out reports/ --department "COMPUTER SCIENCE"
+    python -m src.reports --db ingest.db --out reports/ --format pdf --generate-advice
+
+PDF output needs WeasyPrint (pip install weasyprint).
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from src.batch import default_workers
+from src.ingest import IngestStore
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger("reports")
+
+REPORT_VERSION = 1  # Bump when the layout changes so resumed runs re-render
+MANIFEST = "manifest.jsonl"
+GRADES = ["A", "B", "C", "D", "E", "F"]
+SECTION_TITLES = {
+    "detailed_analysis": "Detailed analysis",
+    "skill_gaps": "Skill gaps",
+    "career_pathways": "Career pathways",
+    "project_ideas": "Project ideas",
+}
+
+STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; color: #1f2937; margin: 2rem auto; max-width: 52rem; }
+h1 { margin-bottom: 0; } .meta { color: #6b7280; margin-top: .25rem; }
+.stats { display: flex; gap: 1rem; margin: 1.5rem 0; }
+.stat { flex: 1; border: 1px solid #e5e7eb; border-radius: 8px; padding: .75rem; }
+.stat b { display: block; font-size: 1.4rem; }
+.charts { display: flex; gap: 1rem; } .charts svg { flex: 1; }
+table { border-collapse: collapse; width: 100%; font-size: .85rem; }
+td, th { border-bottom: 1px solid #e5e7eb; padding: .3rem; text-align: left; }
+section { page-break-inside: avoid; margin-top: 1.5rem; }
+"""
+
+
+# -------------------------------------------------------------------
+# Charts (inline SVG)
+# -------------------------------------------------------------------
+def grade_chart_svg(df: pd.DataFrame, width: int = 360, height: int = 200) -> str:
+    """Bar chart of results per grade."""
+    counts = df["Grade"].str[0].value_counts()
+    values = [int(counts.get(g, 0)) for g in GRADES]
+    top = max(values + [1])
+    bar_w = (width - 40) / len(GRADES)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" role="img">',
+             f'<text x="{width / 2}" y="14" text-anchor="middle" font-size="12">Grade distribution</text>']
+    for i, (grade, value) in enumerate(zip(GRADES, values)):
+        h = (height - 50) * value / top
+        x = 30 + i * bar_w
+        y = height - 25 - h
+        parts.append(f'<rect x="{x + 4:.1f}" y="{y:.1f}" width="{bar_w - 8:.1f}" height="{h:.1f}" fill="#6366f1"/>')
+        parts.append(f'<text x="{x + bar_w / 2:.1f}" y="{height - 10}" text-anchor="middle" font-size="11">{grade}</text>')
+        parts.append(f'<text x="{x + bar_w / 2:.1f}" y="{y - 3:.1f}" text-anchor="middle" font-size="10">{value}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def gpa_chart_svg(df: pd.DataFrame, width: int = 360, height: int = 200) -> str:
+    """Line chart of credit-weighted GPA per year, on a fixed 0-5 axis."""
+    by_year = df.dropna(subset=["Year"]).groupby("Year")[["Credit_Value", "Credit_Unit"]].sum()
+    gpas = (by_year["Credit_Value"] / by_year["Credit_Unit"]).round(2)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" role="img">',
+             f'<text x="{width / 2}" y="14" text-anchor="middle" font-size="12">GPA by year</text>']
+    if len(gpas):
+        step = (width - 60) / max(len(gpas) - 1, 1)
+        points = [(30 + i * step, height - 25 - (height - 50) * g / 5.0) for i, g in enumerate(gpas)]
+        path = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+        parts.append(f'<polyline points="{path}" fill="none" stroke="#10b981" stroke-width="2"/>')
+        for (x, y), (year, gpa) in zip(points, gpas.items()):
+            parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="#10b981"/>')
+            parts.append(f'<text x="{x:.1f}" y="{y - 6:.1f}" text-anchor="middle" font-size="10">{gpa:.2f}</text>')
+            parts.append(f'<text x="{x:.1f}" y="{height - 10}" text-anchor="middle" font-size="11">Y{int(year)}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+# -------------------------------------------------------------------
+# HTML
+# -------------------------------------------------------------------
+def _inline(text: str) -> str:
+    text = html.escape(text)
+    return re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", text)
+
+
+def markdown_html(text: str) -> str:
+    """The small Markdown subset advisor output uses: headings, lists, bold, paragraphs."""
+    out: List[str] = []
+    in_list = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        heading = re.match(r"^(#{1,4})\s+(.*)", line)
+        bullet = re.match(r"^[-*•]\s+(.*)", line)
+        numbered = re.match(r"^\d+[.)]\s+(.*)", line)
+        tag = "ul" if bullet else "ol" if numbered else None
+        if in_list and tag != in_list:
+            out.append(f"</{in_list}>")
+            in_list = None
+        if heading:
+            level = min(len(heading.group(1)) + 2, 6)
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif tag:
+            if in_list is None:
+                out.append(f"<{tag}>")
+                in_list = tag
+            out.append(f"<li>{_inline((bullet or numbered).group(1))}</li>")
+        elif line:
+            out.append(f"<p>{_inline(line)}</p>")
+    if in_list:
+        out.append(f"</{in_list}>")
+    return "\n".join(out)
+
+
+def render_html(df: pd.DataFrame, student_info: Dict, advice: Dict[str, str]) -> Iterator[str]:
+    """
+    One student's report as HTML chunks, so it can be written without
+    holding the whole document in memory.
+
+    Args:
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+        advice: Advisor sections by name (missing ones are skipped)
+
+    Yields:
+        HTML text
+    """
+    from src.insights import compute_insights, insights_markdown
+    from src.parser import get_quick_stats
+
+    stats = get_quick_stats(df)
+    name = html.escape(student_info.get("Name") or "Student")
+    meta = " · ".join(html.escape(str(student_info.get(k))) for k in ("Matric_No", "Department", "Faculty") if student_info.get(k))
+    yield f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{name}</title><style>{STYLE}</style></head><body>'
+    yield f"<h1>{name}</h1><p class=\"meta\">{meta}</p>"
+    yield '<div class="stats">' + "".join(
+        f'<div class="stat">{label}<b>{value}</b></div>'
+        for label, value in (
+            ("Overall GPA", stats["overall_gpa"]),
+            ("Courses", stats["total_courses"]),
+            ("Credits", stats["total_credits"]),
+            ("Best grade point", stats["best_grade"]),
+        )
+    ) + "</div>"
+    yield f'<div class="charts">{grade_chart_svg(df)}{gpa_chart_svg(df)}</div>'
+    yield f"<section><h2>Key facts</h2>{markdown_html(insights_markdown(compute_insights(df)))}</section>"
+    for section, title in SECTION_TITLES.items():
+        if advice.get(section):
+            yield f"<section><h2>{title}</h2>{markdown_html(advice[section])}</section>"
+    yield "<section><h2>All courses</h2><table><tr><th>Year</th><th>Code</th><th>Title</th><th>Units</th><th>Grade</th></tr>"
+    for r in df.sort_values(["Year", "Course_Code"]).itertuples():
+        yield (f"<tr><td>{r.Year}</td><td>{html.escape(str(r.Course_Code))}</td><td>{html.escape(str(r.Course_Title))}</td>"
+               f"<td>{r.Credit_Unit}</td><td>{html.escape(str(r.Grade))}</td></tr>")
+    yield "</table></section></body></html>"
+
+
+# -------------------------------------------------------------------
+# Pipeline
+# -------------------------------------------------------------------
+def _weasyprint():
+    try:
+        import weasyprint
+    except ImportError as e:
+        raise ImportError(
+            "WeasyPrint is required for PDF reports.\n"
+            "Install it with: pip install weasyprint"
+        ) from e
+    return weasyprint
+
+
+def signature(digest: str, advice: Dict[str, str]) -> str:
+    """Identity of a report's inputs; a report is re-rendered when it changes."""
+    payload = json.dumps([REPORT_VERSION, digest, sorted(advice.items())]).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def _file_stem(student_info: Dict, digest: str) -> str:
+    # Matric numbers are not unique across uploads, so the content hash disambiguates
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "_", student_info.get("Matric_No") or "")
+    return f"{stem}_{digest[:8]}" if stem else digest[:16]
+
+
+_stores: Dict[str, IngestStore] = {}
+
+
+def _render_one(db_path: str, digest: str, out_dir: str, fmt: str) -> Tuple[str, str, str]:
+    # Runs in a worker process, which opens the store once and reuses it
+    store = _stores.get(db_path) or _stores.setdefault(db_path, IngestStore(db_path))
+    df, info = store.transcript(digest)
+    advice = store.advice(digest)
+    path = os.path.join(out_dir, f"{_file_stem(info, digest)}.{fmt}")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    html_path = tmp if fmt == "html" else tmp + ".html"
+    try:
+        with open(html_path, "w", encoding="utf-8") as f:
+            for chunk in render_html(df, info, advice):
+                f.write(chunk)
+        if fmt == "pdf":
+            _weasyprint().HTML(filename=html_path).write_pdf(tmp)
+        os.replace(tmp, path)
+    finally:
+        # Nothing half-written is left behind, whether rendering failed or not
+        for leftover in {tmp, html_path}:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return digest, os.path.basename(path), signature(digest, advice)
+
+
+def _read_manifest(out_dir: str) -> Dict[str, Dict]:
+    done: Dict[str, Dict] = {}
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A torn last line from an interrupted run
+                done[entry["digest"]] = entry
+    return done
+
+
+def generate_missing_advice(store: IngestStore, digests: Iterable[str], workers: int = 8) -> int:
+    """
+    Generate and store the full advisor report for transcripts that have none.
+
+    LLM calls are I/O bound, so they run in threads in this process. Each
+    task loads its own transcript, so only those in flight are in memory.
+
+    Returns:
+        Number of transcripts that got advice
+    """
+    from src.advisor import generate_full_report
+
+    lock = threading.Lock()  # One SQLite connection, shared by the threads
+
+    def advise(digest: str) -> Dict[str, str]:
+        with lock:
+            df, info = store.transcript(digest)
+        return generate_full_report(df, info)
+
+    missing = [d for d in digests if not store.advice(d)]
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-advice") as pool:
+        futures = {pool.submit(advise, d): d for d in missing}
+        for future in as_completed(futures):
+            try:
+                sections = future.result()
+                with lock:
+                    store.record_advice(futures[future], sections)
+                done += 1
+            except Exception as e:
+                log.warning("advice failed for %s: %s", futures[future][:12], e)
+    return done
+
+
+def render_reports(
+    db_path: str,
+    out_dir: str,
+    fmt: str = "html",
+    department: str | None = None,
+    workers: int | None = None,
+    resume: bool = True,
+    on_progress: Callable[[int, int, str], None] | None = None,
+) -> Dict:
+    """
+    Render one report per ingested transcript in a process pool.
+
+    Args:
+        db_path: Ingestion store path
+        out_dir: Output directory (also holds the resume manifest)
+        fmt: "html" or "pdf"
+        department: Only students of this department
+        workers: Worker processes (defaults to PARSE_WORKERS or CPU count)
+        resume: Skip reports whose inputs match the manifest and whose file exists
+        on_progress: Called as (completed, total, file name) after each report
+
+    Returns:
+        Counts of rendered, skipped and failed reports
+    """
+    if fmt not in ("html", "pdf"):
+        raise ValueError(f"Unknown report format: {fmt}")
+    if fmt == "pdf":
+        _weasyprint()  # Fail before starting workers
+    os.makedirs(out_dir, exist_ok=True)
+    store = IngestStore(db_path)
+    manifest = _read_manifest(out_dir) if resume else {}
+
+    todo, skipped = [], 0
+    for digest in store.digests(department):
+        entry = manifest.get(digest)
+        if (entry and entry["signature"] == signature(digest, store.advice(digest))
+                and entry["file"].endswith(f".{fmt}") and os.path.exists(os.path.join(out_dir, entry["file"]))):
+            skipped += 1
+        else:
+            todo.append(digest)
+    store.close()
+
+    rendered = failed = 0
+    with open(os.path.join(out_dir, MANIFEST), "a", encoding="utf-8") as log, \
+            ProcessPoolExecutor(max_workers=min(workers or default_workers(), max(len(todo), 1))) as pool:
+        futures = [pool.submit(_render_one, db_path, digest, out_dir, fmt) for digest in todo]
+        for future in as_completed(futures):
+            try:
+                digest, name, sig = future.result()
+                log.write(json.dumps({"digest": digest, "file": name, "signature": sig}) + "\n")
+                log.flush()
+                rendered += 1
+            except Exception as e:
+                name = f"error: {e}"
+                failed += 1
+            if on_progress:
+                on_progress(rendered + failed, len(todo), name)
+    return {"rendered": rendered, "skipped": skipped, "failed": failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render advisory reports for ingested students")
+    parser.add_argument("--db", required=True, help="Ingestion store (see src.ingest)")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--format", choices=["html", "pdf"], default="html")
+    parser.add_argument("--department")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-resume", action="store_true", help="Re-render everything")
+    parser.add_argument("--generate-advice", action="store_true", help="Call the advisor for students without stored advice")
+    parser.add_argument("--advice-workers", type=int, default=8)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.generate_advice:
+        store = IngestStore(args.db)
+        count = generate_missing_advice(store, store.digests(args.department), args.advice_workers)
+        store.close()
+        print(f"Generated advice for {count} student(s)")
+
+    start = time.perf_counter()
+
+    def progress(done: int, total: int, name: str) -> None:
+        rate = done / (time.perf_counter() - start)
+        eta = (total - done) / rate if rate else 0
+        print(f"\r[{done}/{total}] {rate:.1f} reports/s, ETA {eta:.0f}s  {name[:40]:<40}", end="", flush=True)
+
+    summary = render_reports(
+        args.db, args.out, args.format, args.department, args.workers, not args.no_resume, progress
+    )
+    print(f"\nRendered {summary['rendered']}, skipped {summary['skipped']} (up to date), failed {summary['failed']}")
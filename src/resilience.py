@@ -0,0 +1,371 @@
+from __future__ import annotations
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator
+
+from src.backends import BackendError, LLMBackend
+
+# Upper bounds of the histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_label: contextvars.ContextVar[str] = contextvars.ContextVar("llm_call_label", default="other")
+_END = object()  # Returned by next() for an exhausted stream
+
+
+class DeadlineExceeded(BackendError):
+    """Raised when an LLM call does not finish within its deadline."""
+
+
+class CircuitOpenError(BackendError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+@contextlib.contextmanager
+def call_label(label: str) -> Iterator[None]:
+    """Attribute LLM calls made inside the block to `label` (e.g. an advisor function)."""
+    token = _label.set(label)
+    try:
+        yield
+    finally:
+        _label.reset(token)
+
+
+class LatencyHistogram:
+    """
+    Bucketed latency counts plus a window of recent samples for quantiles.
+
+    Args:
+        window: Number of recent successful samples kept for quantile estimates
+    """
+
+    def __init__(self, window: int = 500):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.errors = 0
+        self._recent: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        ms = seconds * 1000.0
+        with self._lock:
+            self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            if ok:
+                self._recent.append(seconds)
+            else:
+                self.errors += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Quantile of recent successful latencies in seconds, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._recent)
+        if len(samples) < 20:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self.counts)
+            errors = self.errors
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": sum(counts),
+            "errors": errors,
+            "buckets": dict(zip(labels, counts)),
+            "p50_s": self.quantile(0.50),
+            "p95_s": self.quantile(0.95),
+            "p99_s": self.quantile(0.99),
+        }
+
+
+class CircuitBreaker:
+    """
+    Fail fast once the recent error rate crosses a threshold.
+
+    The breaker opens when at least `min_calls` of the last `window` calls
+    were recorded and the failure ratio reaches `error_rate`. After
+    `cooldown_s` a single trial call is let through (half-open); its outcome
+    closes or re-opens the circuit.
+
+    allow() hands out a ticket that the caller passes back to record() or
+    release(), so only the admitted trial call decides the half-open state;
+    late results from calls admitted before the circuit opened are ignored.
+    """
+
+    def __init__(self, error_rate: float = 0.5, window: int = 20, min_calls: int = 10, cooldown_s: float = 30.0):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown_s = cooldown_s
+        self._outcomes: deque = deque(maxlen=window)
+        self._opened_at: float | None = None
+        self._trial: int | None = None
+        self._tickets = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown_s:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> int | None:
+        """
+        Admit a call to the provider.
+
+        Returns:
+            A ticket for record() or release(): 0 while the circuit is
+            closed, a fresh trial number when half-open, or None if the
+            call must fail fast
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            if time.monotonic() - self._opened_at < self.cooldown_s or self._trial is not None:
+                return None
+            self._tickets += 1
+            self._trial = self._tickets
+            return self._trial
+
+    def release(self, ticket: int) -> None:
+        """Give up an admitted call without an outcome (e.g. an abandoned stream)."""
+        with self._lock:
+            if ticket and ticket == self._trial:
+                # Let the next caller run the half-open trial instead
+                self._trial = None
+
+    def record(self, ok: bool, ticket: int) -> None:
+        """Record the outcome of the call admitted with `ticket`."""
+        with self._lock:
+            if self._opened_at is not None:
+                if not ticket or ticket != self._trial:
+                    # Late result from a call admitted before the circuit opened
+                    return
+                # Outcome of the half-open trial call
+                self._trial = None
+                if ok:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                self._opened_at = time.monotonic()
+
+
+@dataclass
+class CallPolicy:
+    """
+    Per-call protection settings.
+
+    Attributes:
+        timeout_s: Deadline for one logical call, including retries and hedges
+        retries: Extra attempts after a failed (not timed-out) attempt
+        retry_backoff_s: Sleep before the first retry, doubled each time
+        hedge: Send a duplicate request when the first one is slow; a label
+            is not hedged until it has enough samples for the quantile
+        hedge_quantile: Latency quantile after which the duplicate is sent
+        hedge_min_s: Never hedge earlier than this
+    """
+    timeout_s: float = 60.0
+    retries: int = 1
+    retry_backoff_s: float = 0.5
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_s: float = 1.0
+
+
+class ResilientBackend(LLMBackend):
+    """
+    Wrap a backend with deadlines, retries, hedged requests and a circuit breaker.
+
+    Latency is recorded per call label (see call_label()), so each advisor
+    function gets its own histogram.
+
+    Attempts that outlive their deadline cannot be cancelled and keep their
+    worker thread until the provider answers. Once all max_workers threads
+    are busy, new calls fail fast instead of queueing behind them, and no
+    hedges are sent; the failures trip the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        inner: LLMBackend,
+        policy: CallPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        max_workers: int = 32,
+    ):
+        self.inner = inner
+        self.name = f"resilient:{inner.name}"
+        self.policy = policy or CallPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._running = 0
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def histogram(self, label: str) -> LatencyHistogram:
+        with self._lock:
+            if label not in self._histograms:
+                self._histograms[label] = LatencyHistogram()
+            return self._histograms[label]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            labels = list(self._histograms)
+            hedges_sent, hedges_won, running = self.hedges_sent, self.hedges_won, self._running
+        return {
+            "breaker": self.breaker.state,
+            "hedges_sent": hedges_sent,
+            "hedges_won": hedges_won,
+            "attempts_running": running,
+            "latency": {label: self.histogram(label).snapshot() for label in labels},
+        }
+
+    def _submit(self, fn: Callable, *args) -> Future | None:
+        """Start one provider request, or return None if every worker is busy."""
+        with self._lock:
+            if self._running >= self.max_workers:
+                return None
+            self._running += 1
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, _future: Future) -> None:
+        with self._lock:
+            self._running -= 1
+
+    def _attempt(self, prompt: str, temperature: float, response_format: dict | None, deadline: float, hist: LatencyHistogram) -> str:
+        """One attempt, possibly hedged, bounded by the absolute deadline."""
+        first = self._submit(self.inner.chat, prompt, temperature, response_format)
+        if first is None:
+            raise BackendError("All LLM workers are busy with stalled requests")
+        futures = [first]
+        hedge_at = None
+        if self.policy.hedge:
+            p = hist.quantile(self.policy.hedge_quantile)
+            if p is not None:
+                hedge_at = time.monotonic() + max(p, self.policy.hedge_min_s)
+
+        error: BaseException | None = None
+        while futures:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(futures, timeout=max(wake - now, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+                error = future.exception()
+            futures = [f for f in futures if f in pending]
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                hedge = self._submit(self.inner.chat, prompt, temperature, response_format)
+                if hedge is not None:
+                    with self._lock:
+                        self.hedges_sent += 1
+                    futures.append(hedge)
+
+        if futures or error is None:
+            raise DeadlineExceeded(f"LLM call exceeded {self.policy.timeout_s:.1f}s deadline")
+        raise error
+
+    def chat(self, prompt: str, temperature: float = 0.7, response_format: dict | None = None) -> str:
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise CircuitOpenError("LLM provider is failing; circuit breaker is open. Try again shortly.")
+
+        hist = self.histogram(_label.get())
+        start = time.monotonic()
+        deadline = start + self.policy.timeout_s
+        backoff = self.policy.retry_backoff_s
+        for attempt in range(self.policy.retries + 1):
+            try:
+                text = self._attempt(prompt, temperature, response_format, deadline, hist)
+            except DeadlineExceeded:
+                hist.record(time.monotonic() - start, ok=False)
+                self.breaker.record(False, ticket)
+                raise
+            except Exception:
+                if attempt < self.policy.retries and time.monotonic() + backoff < deadline:
+                    time.sleep(backoff)
+                    backoff *= 2
+                    continue
+                hist.record(time.monotonic() - start, ok=False)
+                self.breaker.record(False, ticket)
+                raise
+            hist.record(time.monotonic() - start, ok=True)
+            self.breaker.record(True, ticket)
+            return text
+
+    def stream(self, prompt: str, temperature: float = 0.7) -> Iterator[str]:
+        """
+        Stream from the inner backend under the call deadline.
+
+        Each chunk is pulled on a worker thread, so a provider that stops
+        sending mid-stream raises DeadlineExceeded on time instead of
+        blocking the consumer until the next chunk arrives.
+        """
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise CircuitOpenError("LLM provider is failing; circuit breaker is open. Try again shortly.")
+
+        hist = self.histogram(_label.get())
+        start = time.monotonic()
+        deadline = start + self.policy.timeout_s
+        chunks = self.inner.stream(prompt, temperature)
+        pending: Future | None = None
+        ok = None
+        try:
+            while True:
+                pending = self._submit(next, chunks, _END)
+                if pending is None:
+                    raise BackendError("All LLM workers are busy with stalled requests")
+                try:
+                    chunk = pending.result(timeout=max(deadline - time.monotonic(), 0))
+                except FutureTimeout:
+                    raise DeadlineExceeded(f"LLM stream exceeded {self.policy.timeout_s:.1f}s deadline") from None
+                pending = None
+                if chunk is _END:
+                    break
+                yield chunk
+            ok = True
+        except Exception:
+            ok = False
+            raise
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                if pending is not None:
+                    # The generator is still running on a worker; close it once it yields
+                    pending.add_done_callback(lambda _future: close())
+                else:
+                    close()
+            if ok is None:
+                # Closed by the consumer (e.g. a Streamlit rerun); says nothing about the provider
+                self.breaker.release(ticket)
+            else:
+                hist.record(time.monotonic() - start, ok=ok)
+                self.breaker.record(ok, ticket)
+
+
+def latency_stats(backend: LLMBackend) -> Dict:
+    """Per-label latency histograms and breaker state, or {} for an unwrapped backend."""
+    return backend.stats() if isinstance(backend, ResilientBackend) else {}
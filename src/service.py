@@ -0,0 +1,369 @@
+"""
+Headless HTTP service for parsing transcripts and generating advice.
+
+Run from the repository root:
+
+    python -m src.service --port 8000
+
+Endpoints:
+    GET  /health               liveness plus queue depths
+    GET  /metrics              request, queue and LLM metrics
+    POST /parse                PDF body -> student_info, courses, stats
+    POST /stats                PDF or {"courses": [...]} body -> stats
+    POST /advise?section=...   PDF or {"student_info", "courses"} body -> advice
+    GET  /jobs/<id>            result of an /advise?async=1 request
+
+PDF parsing runs in a process pool and advisor calls in a thread pool.
+Each pool has a bounded queue; requests beyond it get 503 with Retry-After
+instead of piling up.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from pdfminer.psparser import PSException
+from pdfplumber.utils.exceptions import MalformedPDFException, PdfminerException
+
+from src.batch import _parse_bytes
+from src.parser import get_quick_stats
+
+# Raised for PDFs that cannot be read; the client sent a bad file, so 400
+PARSE_ERRORS = (PSException, PdfminerException, MalformedPDFException)
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+SECTIONS = ("project_ideas", "career_pathways", "skill_gaps", "detailed_analysis", "full")
+
+
+class Overloaded(Exception):
+    """Raised when a worker pool's queue is full."""
+
+
+class BoundedPool:
+    """
+    An executor that refuses work beyond `workers + queue_limit` in flight.
+
+    A process pool broken by a crashed worker is replaced on the next submit.
+
+    Args:
+        executor: Underlying thread or process pool
+        workers: Number of workers in the executor
+        queue_limit: Jobs allowed to wait for a free worker
+    """
+
+    def __init__(self, executor, workers: int, queue_limit: int):
+        self.executor = executor
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            try:
+                future = self.executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._restart(self.executor)
+                future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._release(None, completed=False)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _restart(self, broken) -> None:
+        with self._lock:
+            if broken is not self.executor:
+                return  # Another request already replaced it
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def _release(self, _future: Future | None, completed: bool = True) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if completed:
+                self.completed += 1
+        self._slots.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "capacity": self.capacity,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+def _jsonable(obj: Any) -> Any:
+    """Convert pandas/NumPy values into plain JSON types."""
+    if isinstance(obj, dict):
+        return {str(k): _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    if hasattr(obj, "item") and callable(obj.item):
+        obj = obj.item()
+    if isinstance(obj, float) and obj != obj:
+        return None
+    return obj
+
+
+def _frame(courses: list):
+    import pandas as pd
+
+    df = pd.DataFrame(courses)
+    missing = [c for c in ("Year", "Credit_Unit", "Grade_Point") if len(df) and c not in df.columns]
+    if missing:
+        raise ValueError(f"courses are missing fields: {', '.join(missing)}")
+    if "Credit_Value" not in df.columns and len(df):
+        df["Credit_Value"] = df["Credit_Unit"] * df["Grade_Point"]
+    return df
+
+
+def _quick_stats(df) -> Dict:
+    if df.empty:
+        raise ValueError("No courses to compute stats from")
+    return get_quick_stats(df)
+
+
+def _advise(section: str, df, student_info: Dict, num_ideas: int, target_role: str | None):
+    from src.advisor import generate_full_report, generate_section
+
+    if section == "full":
+        return generate_full_report(df, student_info, num_ideas, target_role)
+    return generate_section(section, df, student_info, num_ideas, target_role)
+
+
+class TranscriptService:
+    """Worker pools, job table and counters shared by all request handlers."""
+
+    def __init__(self, parse_workers: int, advise_workers: int, queue_limit: int, request_timeout_s: float):
+        self.parse_pool = BoundedPool(ProcessPoolExecutor(max_workers=parse_workers), parse_workers, queue_limit)
+        self.advise_pool = BoundedPool(
+            ThreadPoolExecutor(max_workers=advise_workers, thread_name_prefix="advise"),
+            advise_workers,
+            queue_limit,
+        )
+        self.request_timeout_s = request_timeout_s
+        self.jobs: "OrderedDict[str, Tuple[float, Future]]" = OrderedDict()
+        self.max_jobs = 10000
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.started = time.time()
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def add_job(self, future: Future) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.jobs[job_id] = (time.time(), future)
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+        return job_id
+
+    def metrics(self) -> Dict:
+        from src.advisor import llm_stats
+
+        with self._lock:
+            requests = dict(self.requests)
+            jobs = len(self.jobs)
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": requests,
+            "parse_pool": self.parse_pool.stats(),
+            "advise_pool": self.advise_pool.stats(),
+            "jobs": jobs,
+            "llm": llm_stats(),
+        }
+
+    def shutdown(self) -> None:
+        self.parse_pool.executor.shutdown(wait=False, cancel_futures=True)
+        self.advise_pool.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    service: TranscriptService
+    protocol_version = "HTTP/1.1"
+
+    # ---------------------------------------------------------------
+    # Plumbing
+    # ---------------------------------------------------------------
+    def log_message(self, format, *args):
+        if os.getenv("SERVICE_ACCESS_LOG"):
+            super().log_message(format, *args)
+
+    def _send(self, status: int, payload: Any, headers: Dict[str, str] | None = None) -> None:
+        body = json.dumps(_jsonable(payload)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str, headers: Dict[str, str] | None = None) -> None:
+        self._send(status, {"error": message}, headers)
+
+    def _body(self) -> bytes | None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._error(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+            self.close_connection = True
+            return None
+        return self.rfile.read(length)
+
+    def _wait(self, future: Future):
+        return future.result(timeout=self.service.request_timeout_s)
+
+    def _load_transcript(self, body: bytes):
+        """(df, student_info) from a PDF body or a JSON body with courses."""
+        if body[:5] == b"%PDF-":
+            return self._wait(self.service.parse_pool.submit(_parse_bytes, body))
+        data = json.loads(body or b"{}")
+        return _frame(data.get("courses", [])), data.get("student_info", {})
+
+    # ---------------------------------------------------------------
+    # Routes
+    # ---------------------------------------------------------------
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.service.count("GET /jobs" if url.path.startswith("/jobs/") else f"GET {url.path}")
+        if url.path == "/health":
+            self._send(200, {
+                "status": "ok",
+                "parse_pool": self.service.parse_pool.stats(),
+                "advise_pool": self.service.advise_pool.stats(),
+            })
+        elif url.path == "/metrics":
+            self._send(200, self.service.metrics())
+        elif url.path.startswith("/jobs/"):
+            self._job(url.path[len("/jobs/"):])
+        else:
+            self._error(404, "Not found")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.service.count(f"POST {url.path}")
+        body = self._body()
+        if body is None:
+            return
+        routes = {"/parse": self._parse, "/stats": self._stats, "/advise": self._advise}
+        route = routes.get(url.path)
+        if route is None:
+            self._error(404, "Not found")
+            return
+        try:
+            route(body, parse_qs(url.query))
+        except Overloaded:
+            self._error(503, "Server busy, retry shortly", {"Retry-After": "1"})
+        except FutureTimeout:
+            self._error(504, "Timed out waiting for a worker")
+        except PARSE_ERRORS as e:
+            self._error(400, f"Could not read PDF: {e}")
+        except (ValueError, KeyError) as e:
+            self._error(400, str(e) or type(e).__name__)
+        except Exception as e:
+            self._error(500, f"{type(e).__name__}: {e}")
+
+    def _parse(self, body: bytes, query: Dict) -> None:
+        if body[:5] != b"%PDF-":
+            raise ValueError("Expected a PDF body")
+        df, info = self._load_transcript(body)
+        self._send(200, {
+            "student_info": info,
+            "courses": df.to_dict(orient="records"),
+            "stats": _quick_stats(df) if len(df) else None,
+        })
+
+    def _stats(self, body: bytes, query: Dict) -> None:
+        df, info = self._load_transcript(body)
+        self._send(200, {"student_info": info, "stats": _quick_stats(df)})
+
+    def _advise(self, body: bytes, query: Dict) -> None:
+        section = query.get("section", ["full"])[0]
+        if section not in SECTIONS:
+            raise ValueError(f"section must be one of: {', '.join(SECTIONS)}")
+        num_ideas = int(query.get("num_ideas", ["5"])[0])
+        target_role = query.get("target_role", [None])[0]
+
+        df, info = self._load_transcript(body)
+        future = self.service.advise_pool.submit(_advise, section, df, info, num_ideas, target_role)
+        if query.get("async", ["0"])[0] in ("1", "true"):
+            job_id = self.service.add_job(future)
+            self._send(202, {"job": job_id, "status": "pending"}, {"Location": f"/jobs/{job_id}"})
+            return
+        self._send(200, {"section": section, "result": self._wait(future)})
+
+    def _job(self, job_id: str) -> None:
+        with self.service._lock:
+            entry = self.service.jobs.get(job_id)
+        if entry is None:
+            self._error(404, "Unknown job")
+            return
+        _, future = entry
+        if not future.done():
+            self._send(200, {"job": job_id, "status": "pending"})
+        elif future.exception() is not None:
+            self._send(200, {"job": job_id, "status": "error", "error": str(future.exception())})
+        else:
+            self._send(200, {"job": job_id, "status": "done", "result": future.result()})
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    parse_workers: int | None = None,
+    advise_workers: int = 8,
+    queue_limit: int = 32,
+    request_timeout_s: float = 120.0,
+) -> ThreadingHTTPServer:
+    """Build (but do not start) the HTTP server and its worker pools."""
+    service = TranscriptService(parse_workers or os.cpu_count() or 1, advise_workers, queue_limit, request_timeout_s)
+    handler = type("BoundHandler", (Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcript parse/advise HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--advise-workers", type=int, default=8)
+    parser.add_argument("--queue-limit", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds a request waits for its worker")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.parse_workers, args.advise_workers, args.queue_limit, args.timeout)
+    print(f"Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.service.shutdown()
+        server.server_close()
@@ -0,0 +1,421 @@
+"""
+TF-IDF index over course titles, for "courses similar to X" and for
+grouping related courses across departments (e.g. statistics taught
+under both MTH and STA).
+
+Build once from a cohort and persist it:
+
+    python -m src.similarity build course_index.npz --db ingest.db
+    python -m src.similarity query course_index.npz "Probability Theory"
+
+Point COURSE_INDEX_PATH at the file to use it in the app and advisor.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TOKEN = re.compile(r"[a-z]+")
+STOPWORDS = {
+    "a", "an", "and", "for", "i", "ii", "iii", "iv", "in", "into", "of", "on", "the", "to", "with",
+    "introduction", "introductory", "intro", "principles", "elements", "general", "basic",
+    "fundamentals", "topics", "special", "course", "advanced", "applied", "elementary",
+}
+SUFFIXES = ("ations", "ation", "ical", "ics", "ic", "al", "ing", "es", "s", "y")
+NGRAM = 4
+NGRAM_WEIGHT = 0.5  # Sub-word features only back up whole-word matches
+LABEL_RATIO = 0.8
+GROUP_THRESHOLD = 0.45  # Cosine similarity that links two titles into one group
+GROUP_K = 10  # Nearest titles considered for links
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping: "statistics" and "statistical" both become "statist"."""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def _words(title: str) -> List[str]:
+    return [w for w in TOKEN.findall(title.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def _gather(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Positions of the concatenated ranges [start, start + length)."""
+    offsets = np.cumsum(np.concatenate([[0], lengths[:-1]]))
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+def _components(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Connected-component id per node (its smallest member), by label propagation."""
+    labels = np.arange(n)
+    while True:
+        linked = np.minimum(labels[src], labels[dst])
+        new = labels.copy()
+        np.minimum.at(new, src, linked)
+        np.minimum.at(new, dst, linked)
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def _features(title: str) -> Dict[str, float]:
+    """Term frequencies: word stems, plus character n-grams of each stem prefixed with '#'."""
+    tf: Dict[str, float] = defaultdict(float)
+    for word in _words(title):
+        stem = _stem(word)
+        tf[stem] += 1.0
+        padded = f"<{stem}>"
+        for i in range(len(padded) - NGRAM + 1):
+            tf["#" + padded[i:i + NGRAM]] += NGRAM_WEIGHT
+    return tf
+
+
+class CourseIndex:
+    """
+    Sparse TF-IDF vectors of distinct course titles, with an inverted index.
+
+    Rows are L2-normalised, so the dot product of two rows is their cosine
+    similarity. Queries score every title at once by accumulating the
+    posting lists of the query's terms with np.bincount.
+
+    Groups of related titles and their labels are computed when the index
+    is built and saved with it.
+    """
+
+    def __init__(
+        self,
+        titles: List[str],
+        codes: List[List[str]],
+        terms: List[str],
+        idf: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        surface: Dict[str, str],
+        groups: np.ndarray | None = None,
+        labels: List[str] | None = None,
+    ):
+        self.titles = titles
+        self.codes = codes
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.idf = idf
+        # Rows (CSR): term ids and weights of each title
+        self.indptr, self.indices, self.data = indptr, indices, data
+        # Columns (CSC): titles and weights of each term
+        order = np.argsort(indices, kind="stable")
+        rows = np.repeat(np.arange(len(titles)), np.diff(indptr))
+        self._post_ptr = np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=len(terms)))])
+        self._post_rows = rows[order]
+        self._post_data = data[order]
+        self.surface = surface
+        self._title_row = {title.lower(): i for i, title in enumerate(titles)}
+        self._code_row = {code: i for i, cs in enumerate(codes) for code in cs}
+        self._groups = groups
+        self._labels = labels
+        self._group_of: Dict[Tuple[str, float], str] = {}
+
+    # ---------------------------------------------------------------
+    # Building and persistence
+    # ---------------------------------------------------------------
+    @classmethod
+    def build(cls, courses: Iterable[Tuple[str, str]]) -> CourseIndex:
+        """
+        Index distinct course titles.
+
+        Args:
+            courses: (Course_Code, Course_Title) pairs; repeats are fine
+
+        Returns:
+            CourseIndex
+        """
+        codes_by_title: Dict[str, set] = {}
+        display: Dict[str, str] = {}
+        for code, title in courses:
+            if not title:
+                continue
+            key = " ".join(title.split()).lower()
+            display.setdefault(key, " ".join(title.split()))
+            codes_by_title.setdefault(key, set()).add(code)
+        keys = sorted(codes_by_title)
+        titles = [display[k] for k in keys]
+        codes = [sorted(codes_by_title[k]) for k in keys]
+
+        tfs = [_features(t) for t in titles]
+        df_counts = Counter(term for tf in tfs for term in tf)
+        terms = sorted(df_counts)
+        vocab = {term: i for i, term in enumerate(terms)}
+        n = max(len(titles), 1)
+        idf = np.log((1 + n) / (1 + np.array([df_counts[t] for t in terms], dtype=np.float64))) + 1.0
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for tf in tfs:
+            ids = np.array([vocab[t] for t in tf], dtype=np.int32)
+            weights = (1 + np.log(np.array(list(tf.values()), dtype=np.float64))) * idf[ids]
+            norm = np.linalg.norm(weights)
+            indices.extend(ids.tolist())
+            data.extend((weights / norm if norm else weights).tolist())
+            indptr.append(len(indices))
+
+        surface: Dict[str, str] = {}
+        for word, _ in Counter(w for t in titles for w in _words(t)).most_common():
+            surface.setdefault(_stem(word), word)
+
+        index = cls(
+            titles, codes, terms, idf.astype(np.float32),
+            np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int32),
+            np.array(data, dtype=np.float32), surface,
+        )
+        index.groups()
+        return index
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> CourseIndex:
+        """Index the distinct titles in a course DataFrame (one student or a cohort)."""
+        return cls.build(zip(df["Course_Code"], df["Course_Title"]))
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            titles=np.array(self.titles),
+            codes=np.array(json.dumps(self.codes)),
+            terms=np.array(self.terms),
+            idf=self.idf,
+            indptr=self.indptr,
+            indices=self.indices,
+            data=self.data,
+            surface=np.array(json.dumps(self.surface)),
+            groups=self.groups(),
+            labels=np.array(json.dumps(self._labels)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> CourseIndex:
+        with np.load(path, allow_pickle=False) as f:
+            # Indexes saved before groups were stored compute them on first use
+            grouped = "groups" in f.files
+            return cls(
+                f["titles"].tolist(), json.loads(str(f["codes"])), f["terms"].tolist(), f["idf"],
+                f["indptr"], f["indices"], f["data"], json.loads(str(f["surface"])),
+                f["groups"] if grouped else None, json.loads(str(f["labels"])) if grouped else None,
+            )
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    # ---------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------
+    def _vector(self, title: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalised (term ids, weights) of any title; unknown terms are dropped."""
+        row = self._title_row.get(" ".join(title.split()).lower())
+        if row is not None:
+            start, end = self.indptr[row], self.indptr[row + 1]
+            return self.indices[start:end], self.data[start:end]
+        tf = {t: v for t, v in _features(title).items() if t in self.vocab}
+        if not tf:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        ids = np.array([self.vocab[t] for t in tf], dtype=np.int32)
+        weights = (1 + np.log(np.array(list(tf.values()), dtype=np.float32))) * self.idf[ids]
+        return ids, weights / np.linalg.norm(weights)
+
+    def scores(self, title: str) -> np.ndarray:
+        """Cosine similarity of a title to every indexed title."""
+        ids, weights = self._vector(title)
+        if not len(ids):
+            return np.zeros(len(self.titles), np.float32)
+        starts, ends = self._post_ptr[ids], self._post_ptr[ids + 1]
+        lengths = ends - starts
+        # Gather every posting of every query term in one go
+        positions = _gather(starts, lengths)
+        rows = self._post_rows[positions]
+        contrib = self._post_data[positions] * np.repeat(weights, lengths)
+        return np.bincount(rows, weights=contrib, minlength=len(self.titles)).astype(np.float32)
+
+    def _resolve(self, query: str) -> str:
+        """Accept a course code as well as a title."""
+        row = self._code_row.get(query.strip().upper())
+        return self.titles[row] if row is not None else query
+
+    def similar(self, query: str, k: int = 5, min_score: float = 0.05) -> List[Tuple[str, List[str], float]]:
+        """
+        Titles most similar to a course title or code.
+
+        Args:
+            query: Course title, or a course code present in the index
+            k: Number of results
+            min_score: Drop results below this cosine similarity
+
+        Returns:
+            (title, course codes, score) tuples, best first; the query's own title is excluded
+        """
+        title = self._resolve(query)
+        scores = self.scores(title)
+        own = self._title_row.get(" ".join(title.split()).lower())
+        if own is not None:
+            scores[own] = -1.0
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self.titles[i], self.codes[i], round(float(scores[i]), 3)) for i in top if scores[i] >= min_score]
+
+    def similar_many(self, queries: Iterable[str], k: int = 5, min_score: float = 0.05) -> List[List[Tuple[str, List[str], float]]]:
+        return [self.similar(q, k, min_score) for q in queries]
+
+    # ---------------------------------------------------------------
+    # Groups of related courses
+    # ---------------------------------------------------------------
+    def _compute_groups(self, threshold: float, k: int) -> np.ndarray:
+        """Link titles to their k nearest neighbours scoring at least threshold; return component ids."""
+        n = len(self.titles)
+        k = min(k, n - 1)
+        if k <= 0:
+            return np.arange(n)
+        src, dst = [], []
+        for i, title in enumerate(self.titles):
+            scores = self.scores(title)
+            scores[i] = -1.0
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[scores[top] >= threshold]
+            src.append(np.full(len(top), i))
+            dst.append(top)
+        _, groups = np.unique(_components(n, np.concatenate(src), np.concatenate(dst)), return_inverse=True)
+        return groups
+
+    def _compute_labels(self, groups: np.ndarray) -> List[str]:
+        """
+        One or two most characteristic words per group, by summed TF-IDF weight.
+
+        A second word is kept when it weighs at least LABEL_RATIO of the first,
+        and words keep the order they have in the group's first title.
+        """
+        n_groups = int(groups.max()) + 1 if len(groups) else 0
+        first = np.full(n_groups, len(groups))
+        np.minimum.at(first, groups, np.arange(len(groups)))
+
+        is_word = np.array([not t.startswith("#") for t in self.terms], dtype=bool)
+        entry_group = np.repeat(groups, np.diff(self.indptr))
+        mask = is_word[self.indices]
+        keys = entry_group[mask].astype(np.int64) * len(self.terms) + self.indices[mask]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.data[mask])
+        key_group, key_term = unique // len(self.terms), unique % len(self.terms)
+        order = np.lexsort((-totals, key_group))
+        bounds = np.searchsorted(key_group[order], np.arange(n_groups + 1))
+
+        labels = []
+        for group in range(n_groups):
+            ranked = order[bounds[group]:bounds[group + 1]][:2]
+            title = self.titles[first[group]]
+            if not len(ranked):
+                labels.append(title)
+                continue
+            stems = [self.terms[key_term[i]] for i in ranked if totals[i] >= LABEL_RATIO * totals[ranked[0]]]
+            words = [_stem(w) for w in _words(title)]
+            stems.sort(key=lambda s: words.index(s) if s in words else len(words))
+            labels.append(" ".join(self.surface.get(s, s).title() for s in stems))
+        return labels
+
+    def groups(self) -> np.ndarray:
+        """
+        Group id per indexed title.
+
+        Titles are linked to their GROUP_K nearest neighbours scoring at least
+        GROUP_THRESHOLD, and connected titles share a group.
+        """
+        if self._groups is None:
+            self._groups = self._compute_groups(GROUP_THRESHOLD, GROUP_K)
+            self._labels = None
+        if self._labels is None:
+            self._labels = self._compute_labels(self._groups)
+        return self._groups
+
+    def group_label(self, group: int) -> str:
+        """Label of a group id from groups() (see _compute_labels)."""
+        self.groups()
+        return self._labels[group]
+
+    def group_of(self, title: str, threshold: float = GROUP_THRESHOLD) -> str:
+        """Group label for any title; unindexed titles join their nearest title's group."""
+        key = (title, threshold)
+        label = self._group_of.get(key)
+        if label is None:
+            label = self._group_of[key] = self._lookup_group(title, threshold)
+        return label
+
+    def _lookup_group(self, title: str, threshold: float) -> str:
+        row = self._title_row.get(" ".join(title.split()).lower())
+        if row is None:
+            scores = self.scores(title)
+            best = int(np.argmax(scores)) if len(scores) else -1
+            if best < 0 or scores[best] < threshold:
+                words = _words(title)
+                return words[0].title() if words else title
+            row = best
+        return self.group_label(int(self.groups()[row]))
+
+
+_index: CourseIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_course_index() -> CourseIndex | None:
+    """Cohort index from COURSE_INDEX_PATH, loaded on first use (None if unset or missing)."""
+    global _index
+    path = os.getenv("COURSE_INDEX_PATH")
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None and os.path.exists(path):
+            _index = CourseIndex.load(path)
+        return _index
+
+
+def _courses_from_db(path: str) -> List[Tuple[str, str]]:
+    import sqlite3
+
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT DISTINCT "Course_Code", "Course_Title" FROM courses').fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Course-title similarity index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build an index and save it")
+    build.add_argument("out", help="Output .npz path")
+    build.add_argument("--db", help="Ingestion store (see src.ingest) to read courses from")
+    build.add_argument("--csv", nargs="*", default=[], help="Course CSV exports to read courses from")
+    query = sub.add_parser("query", help="Courses similar to a title or code")
+    query.add_argument("index")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        courses = _courses_from_db(args.db) if args.db else []
+        if args.csv:
+            from pandas import read_csv
+
+            for path in args.csv:
+                frame = read_csv(path, usecols=["Course_Code", "Course_Title"])
+                courses += list(zip(frame["Course_Code"], frame["Course_Title"]))
+        index = CourseIndex.build(courses)
+        index.save(args.out)
+        print(f"Indexed {len(index)} titles, {len(set(index.groups().tolist()))} groups -> {args.out}")
+    else:
+        index = CourseIndex.load(args.index)
+        for title, codes, score in index.similar(args.text, args.k):
+            print(f"{score:.3f}  {', '.join(codes):<20} {title}")
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import hashlib
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception). Nothing is
+    cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() for key, or join the call already in flight for it.
+
+        Args:
+            key: Identity of the request (see prompt_key())
+            fn: Zero-argument callable that performs the request
+
+        Returns:
+            Whatever fn() returned for the leading caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": round(self.coalesced / total, 3) if total else 0.0,
+            }
+
+
+def prompt_key(*parts: Any) -> str:
+    """Stable hash of a prompt and the options that change its answer."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(repr(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# Shared by every Streamlit session in this process
+advisor_flight = SingleFlight()
@@ -0,0 +1,282 @@
+"""
+Compact binary snapshots of parsed transcripts.
+
+A snapshot holds one parse result, (df, student_info), as typed column
+buffers behind a small JSON header:
+
+    magic (6 bytes) | version (uint16) | header length (uint32) | header JSON
+    | padding to 8 bytes | column buffers, each padded to 8 bytes
+
+Numeric columns are stored as their little-endian NumPy buffers and load
+as zero-copy views (of a memory map with load(path, mmap=True)). String
+columns are one NUL-separated UTF-8 blob, decoded with a single split,
+plus a validity mask when they contain nulls. A string column holding a
+single value, such as the student's name, is stored once in the header.
+
+concat() builds one cohort frame from many snapshots with one NumPy
+concatenation and one decode per column, instead of one DataFrame per file.
+"""
+from __future__ import annotations
+import json
+import os
+import struct
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+MAGIC = b"TSNAP\x00"
+VERSION = 1
+_PREFIX = struct.Struct("<6sHI")
+_ALIGN = 8
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+def _column(series: pd.Series) -> Tuple[Dict, List[bytes]]:
+    """Header entry and buffers of one column."""
+    import numpy as np
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        if series.hasnans and not pd.api.types.is_float_dtype(series.dtype):
+            series = series.astype("float64")  # Nullable integers keep their nulls as NaN
+        values = series.to_numpy()
+        values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+        return {"kind": "num", "dtype": values.dtype.str}, [values.tobytes()]
+
+    mask = series.isna().to_numpy()
+    strings = series.astype(object).where(~mask, "").map(str)
+    unique = strings.unique()
+    if not mask.any() and len(unique) == 1:
+        return {"kind": "const", "value": unique[0]}, []
+    text = "\x00".join(strings)
+    if text.count("\x00") != max(len(strings) - 1, 0):
+        raise ValueError(f"Column {series.name!r} contains NUL characters")
+    entry: Dict = {"kind": "str"}
+    buffers = [text.encode("utf-8")]
+    if mask.any():
+        entry["masked"] = True
+        buffers.append(np.packbits(mask).tobytes())
+    return entry, buffers
+
+
+def dumps(df: pd.DataFrame, student_info: Dict | None = None) -> bytes:
+    """
+    Serialize one parse result to snapshot bytes.
+
+    Args:
+        df: DataFrame with course information
+        student_info: Dictionary with student details
+
+    Returns:
+        Snapshot bytes
+    """
+    columns: List[Dict] = []
+    body: List[bytes] = []
+    offset = 0
+    for name in df.columns:
+        entry, buffers = _column(df[name])
+        entry["name"] = str(name)
+        entry["buffers"] = []
+        for buf in buffers:
+            entry["buffers"].append([offset, len(buf)])
+            body += [buf, b"\x00" * _pad(len(buf))]
+            offset += len(buf) + _pad(len(buf))
+        columns.append(entry)
+
+    header = json.dumps(
+        {"rows": len(df), "student_info": student_info or {}, "columns": columns}, separators=(",", ":")
+    ).encode("utf-8")
+    head = _PREFIX.pack(MAGIC, VERSION, len(header)) + header
+    return b"".join([head, b"\x00" * _pad(len(head)), *body])
+
+
+def _open(buf) -> Tuple[Dict, memoryview]:
+    """Header and column data area of a snapshot buffer."""
+    view = memoryview(buf).cast("B")
+    if len(view) < _PREFIX.size:
+        raise ValueError("Not a transcript snapshot")
+    magic, version, header_len = _PREFIX.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not a transcript snapshot")
+    if version > VERSION:
+        raise ValueError(f"Snapshot version {version} is newer than supported version {VERSION}")
+    end = _PREFIX.size + header_len
+    header = json.loads(bytes(view[_PREFIX.size:end]))
+    return header, view[end + _pad(end):]
+
+
+def _slice(data: memoryview, span: Sequence[int]) -> memoryview:
+    offset, length = span
+    return data[offset:offset + length]
+
+
+def _strings(blobs: List[memoryview], rows: int) -> np.ndarray:
+    """Decode NUL-separated blobs (one per snapshot) with a single split."""
+    import numpy as np
+
+    if rows == 0:
+        return np.empty(0, dtype=object)
+    text = b"\x00".join(blobs).decode("utf-8")
+    return np.array(text.split("\x00"), dtype=object)
+
+
+def _frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    import pandas as pd
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def loads(buf) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Read one snapshot from bytes, a memoryview or a memory map.
+
+    Numeric columns are views of buf, so buf must stay alive and unchanged
+    while the DataFrame is in use.
+
+    Returns:
+        (df, student_info)
+    """
+    import numpy as np
+
+    header, data = _open(buf)
+    rows = header["rows"]
+    columns: Dict[str, np.ndarray] = {}
+    for col in header["columns"]:
+        spans = col.get("buffers", [])
+        if col["kind"] == "num":
+            columns[col["name"]] = np.frombuffer(_slice(data, spans[0]), dtype=np.dtype(col["dtype"]))
+        elif col["kind"] == "const":
+            columns[col["name"]] = np.full(rows, col["value"], dtype=object)
+        else:
+            values = _strings([_slice(data, spans[0])], rows)
+            if col.get("masked"):
+                mask = np.unpackbits(np.frombuffer(_slice(data, spans[1]), dtype=np.uint8), count=rows).astype(bool)
+                values[mask] = None
+            columns[col["name"]] = values
+    return _frame(columns), header["student_info"]
+
+
+def save(path: str, df: pd.DataFrame, student_info: Dict | None = None) -> None:
+    """Write a snapshot file atomically."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(dumps(df, student_info))
+    os.replace(tmp, path)
+
+
+def load(path: str, mmap: bool = True) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Read a snapshot file.
+
+    Args:
+        path: Snapshot file
+        mmap: Memory-map the file so numeric columns are not copied
+
+    Returns:
+        (df, student_info)
+    """
+    import numpy as np
+
+    if mmap:
+        return loads(np.memmap(path, dtype=np.uint8, mode="r"))
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def concat(buffers: Iterable, info_columns: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    One cohort frame from many snapshots.
+
+    Per snapshot only the header is parsed; column data is gathered as
+    buffer slices and turned into arrays once per column for the whole
+    cohort. Columns missing from some snapshots are filled with nulls.
+
+    Args:
+        buffers: Snapshot bytes (or memoryviews / memory maps)
+        info_columns: student_info fields to add as columns (e.g. "Department")
+
+    Returns:
+        DataFrame with the union of the snapshots' columns
+    """
+    import numpy as np
+
+    opened = [_open(buf) for buf in buffers]
+    counts = np.array([header["rows"] for header, _ in opened], dtype=np.int64)
+    total = int(counts.sum())
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64) if len(counts) else counts
+
+    # Column name -> kind and, per snapshot, where its data is
+    layout: Dict[str, Dict] = {}
+    for i, (header, data) in enumerate(opened):
+        for col in header["columns"]:
+            entry = layout.setdefault(col["name"], {"kinds": set(), "parts": {}})
+            entry["kinds"].add("num" if col["kind"] == "num" else "str")
+            entry["parts"][i] = (col, data)
+
+    columns: Dict[str, np.ndarray] = {}
+    for name, entry in layout.items():
+        parts = entry["parts"]
+        if entry["kinds"] == {"num"} and len(parts) == len(opened):
+            columns[name] = np.concatenate([
+                np.frombuffer(_slice(data, col["buffers"][0]), dtype=np.dtype(col["dtype"]))
+                for col, data in parts.values()
+            ])
+            continue
+
+        out = np.empty(total, dtype=object)
+        nulls = np.ones(total, dtype=bool)
+        str_rows: List[np.ndarray] = []
+        blobs: List[memoryview] = []
+        const_values, const_counts, const_starts = [], [], []
+        for i, (col, data) in parts.items():
+            n, start = int(counts[i]), int(starts[i])
+            if n == 0:
+                continue
+            nulls[start:start + n] = False
+            if col["kind"] == "const":
+                const_values.append(col["value"])
+                const_counts.append(n)
+                const_starts.append(start)
+            elif col["kind"] == "num":
+                # Same name stored as numbers in one snapshot and strings in another
+                out[start:start + n] = np.frombuffer(_slice(data, col["buffers"][0]), dtype=np.dtype(col["dtype"]))
+            else:
+                blobs.append(_slice(data, col["buffers"][0]))
+                str_rows.append(np.arange(start, start + n))
+                if col.get("masked"):
+                    mask = np.unpackbits(
+                        np.frombuffer(_slice(data, col["buffers"][1]), dtype=np.uint8), count=n
+                    ).astype(bool)
+                    nulls[start:start + n] = mask
+        if blobs:
+            out[np.concatenate(str_rows)] = _strings(blobs, total)
+        if const_values:
+            rows = np.repeat(np.arange(len(const_values)), const_counts)
+            offsets = np.arange(len(rows)) - np.repeat(np.cumsum(const_counts) - const_counts, const_counts)
+            out[np.repeat(const_starts, const_counts) + offsets] = np.array(const_values, dtype=object)[rows]
+        out[nulls] = None
+        columns[name] = out
+
+    for field in info_columns:
+        values = np.array([header["student_info"].get(field) for header, _ in opened], dtype=object)
+        columns[field] = np.repeat(values, counts)
+    return _frame(columns)
+
+
+def load_many(paths: Iterable[str], info_columns: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    One cohort frame from snapshot files.
+
+    Snapshots are small, so each is read whole; a memory map per file would
+    cost more in system calls than it saves in copying.
+    """
+    buffers = []
+    for path in paths:
+        with open(path, "rb") as f:
+            buffers.append(f.read())
+    return concat(buffers, info_columns)
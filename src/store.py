@@ -0,0 +1,149 @@
+from __future__ import annotations
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+
+from src.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+@dataclass
+class _Entry:
+    df: pd.DataFrame
+    student_info: Dict
+    nbytes: int
+    refs: int = 0
+
+
+class TranscriptHandle:
+    """
+    A session's reference to a transcript held in a TranscriptStore.
+
+    The DataFrame is shared with every other session that loaded the same
+    file, so treat it as read-only. The reference is released by release(),
+    or when the handle is garbage collected with its session.
+    """
+
+    def __init__(self, store: TranscriptStore, digest: str, entry: _Entry):
+        self.digest = digest
+        self._entry = entry
+        self._release = weakref.finalize(self, store.release, digest)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._entry.df
+
+    @property
+    def student_info(self) -> Dict:
+        return self._entry.student_info
+
+    def release(self) -> None:
+        """Drop this handle's reference (safe to call more than once)."""
+        self._release()
+
+
+class TranscriptStore:
+    """
+    Parsed transcripts shared by all sessions in a process, keyed by content hash.
+
+    Entries referenced by a live handle are pinned. Unreferenced entries stay
+    cached for re-uploads and are evicted least recently used first once the
+    store holds more than max_entries transcripts or max_bytes of frames.
+    Pinned entries are never evicted, so the budget can be exceeded while
+    that many sessions hold distinct transcripts.
+
+    Args:
+        max_entries: Transcripts kept, pinned ones included
+        max_bytes: Total DataFrame memory kept (None for no byte limit)
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Re-entrant: a handle collected mid-operation releases on the same thread
+        self._lock = threading.RLock()
+        self._flight = SingleFlight()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, digest: str, load: Callable[[], Tuple[pd.DataFrame, Dict]]) -> TranscriptHandle:
+        """
+        Handle to the transcript with this content hash, loading it if needed.
+
+        Concurrent acquires of a missing transcript share one load() call.
+
+        Args:
+            digest: Content hash of the transcript file
+            load: Returns (df, student_info); called only on a miss
+
+        Returns:
+            TranscriptHandle holding one reference
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self.hits += 1
+                return self._pin(digest, entry)
+            self.misses += 1
+
+        df, student_info = self._flight.do(digest, load)
+        with self._lock:
+            # Another caller of the same load may already have inserted it
+            entry = self._entries.get(digest)
+            if entry is None:
+                entry = self._entries[digest] = _Entry(df, student_info, _frame_bytes(df))
+                self.nbytes += entry.nbytes
+            handle = self._pin(digest, entry)
+            self._evict()
+            return handle
+
+    def _pin(self, digest: str, entry: _Entry) -> TranscriptHandle:
+        entry.refs += 1
+        self._entries.move_to_end(digest)
+        return TranscriptHandle(self, digest, entry)
+
+    def release(self, digest: str) -> None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+                self._evict()
+
+    def _evict(self) -> None:
+        # Caller holds the lock
+        def over() -> bool:
+            return len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes
+            )
+
+        if not over():
+            return
+        for digest in [d for d, e in self._entries.items() if e.refs == 0]:
+            entry = self._entries.pop(digest)
+            self.nbytes -= entry.nbytes
+            self.evictions += 1
+            if not over():
+                break
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "transcripts": len(self._entries),
+                "pinned": sum(1 for e in self._entries.values() if e.refs),
+                "handles": sum(e.refs for e in self._entries.values()),
+                "mb": round(self.nbytes / 2**20, 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
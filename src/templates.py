@@ -0,0 +1,223 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from src.parser import HEADER_VARIANTS, Item, TableLayout
+
+# Share of course-code lines a plan must read as courses to be trusted
+MIN_COVERAGE = 0.9
+
+# Subset fonts are embedded as e.g. "ABCDEF+Arial-BoldMT"; the prefix varies per file
+SUBSET_PREFIX = re.compile(r"^[A-Z]{6}\+")
+
+
+def font_names(page) -> List[str]:
+    """Base font names in a page's resource dictionary (no content is parsed)."""
+    from pdfminer.pdftypes import resolve1
+
+    resources = resolve1(page.page_obj.resources) or {}
+    fonts = resolve1(resources.get("Font")) or {}
+    names = set()
+    for ref in fonts.values():
+        base = (resolve1(ref) or {}).get("BaseFont")
+        if base is not None:
+            names.add(SUBSET_PREFIX.sub("", getattr(base, "name", str(base))))
+    return sorted(names)
+
+
+def fingerprint(pdf) -> str:
+    """
+    Cheap identity of a transcript's print template.
+
+    Built from the first page's size and the fonts it declares, which is read
+    from the page dictionary without extracting any text. Anchor labels are
+    checked later, when a cached plan is applied (see ExtractionPlan.fits).
+
+    Args:
+        pdf: Open pdfplumber document
+
+    Returns:
+        Short hex digest
+    """
+    page = pdf.pages[0]
+    parts = [f"{round(page.width)}x{round(page.height)}", *font_names(page)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class ExtractionPlan:
+    """
+    Everything layout detection learns about one template.
+
+    Attributes:
+        fingerprint: Template fingerprint the plan was built for
+        layout: Course table column positions (None for plain-text templates)
+        session_pattern: Pattern for session/year lines
+        header_fields: Pattern per student-detail field
+        anchors: Fields whose labels were found when the plan was built
+    """
+    fingerprint: str
+    layout: TableLayout | None
+    session_pattern: re.Pattern
+    header_fields: Dict[str, re.Pattern]
+    anchors: Tuple[str, ...] = field(default_factory=tuple)
+
+    def fits(self, pages: List[List[Item]], student_info: Dict, code_rows: int = 0) -> bool:
+        """
+        Whether a document read with this plan is complete.
+
+        Args:
+            pages: Items per page read with the plan
+            student_info: Student details read with the plan
+            code_rows: Lines in the document that carry a course code
+
+        Returns:
+            True if at least MIN_COVERAGE of the course-code lines were read
+            as courses and every anchor field was found
+        """
+        courses = sum(1 for items in pages for item in items if item[0] == "course")
+        if courses == 0 or courses < MIN_COVERAGE * code_rows:
+            return False
+        return all(student_info.get(name) for name in self.anchors)
+
+    def to_dict(self) -> Dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "layout": vars(self.layout) if self.layout else None,
+            "session_pattern": self.session_pattern.pattern,
+            "header_fields": {k: p.pattern for k, p in self.header_fields.items()},
+            "anchors": list(self.anchors),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> ExtractionPlan:
+        return cls(
+            fingerprint=data["fingerprint"],
+            layout=TableLayout(**data["layout"]) if data["layout"] else None,
+            session_pattern=re.compile(data["session_pattern"]),
+            header_fields={k: re.compile(p) for k, p in data["header_fields"].items()},
+            anchors=tuple(data["anchors"]),
+        )
+
+
+def build_plan(key: str, layout: TableLayout | None, session_pattern: re.Pattern, header_text: str) -> ExtractionPlan:
+    """
+    Compile the plan for a newly seen template.
+
+    Each header field gets the first label variant that matches the
+    document's header text, or the default label if none does.
+
+    Args:
+        key: Template fingerprint
+        layout: Detected column layout, or None
+        session_pattern: Session pattern chosen during detection
+        header_text: Text of the regions around the course table
+
+    Returns:
+        ExtractionPlan
+    """
+    header_fields = {}
+    anchors = []
+    for name, variants in HEADER_VARIANTS.items():
+        match = next((p for p in variants if p.search(header_text)), None)
+        header_fields[name] = match or variants[0]
+        if match is not None:
+            anchors.append(name)
+    return ExtractionPlan(key, layout, session_pattern, header_fields, tuple(anchors))
+
+
+class TemplateRegistry:
+    """
+    Extraction plans per template fingerprint, shared by all parses in a process.
+
+    Plans are kept in LRU order. With a path, they are also written to a
+    JSON file so worker processes and restarts start with known templates.
+    """
+
+    def __init__(self, max_plans: int = 256, path: str | None = None):
+        self.max_plans = max_plans
+        self.path = path
+        self._plans: "OrderedDict[str, ExtractionPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def get(self, key: str) -> ExtractionPlan | None:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, plan: ExtractionPlan) -> None:
+        with self._lock:
+            self._plans[plan.fingerprint] = plan
+            self._plans.move_to_end(plan.fingerprint)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+            self._save()
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if self._plans.pop(key, None) is not None:
+                self._save()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "templates": len(self._plans),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = 0
+            self._save()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                plans = [ExtractionPlan.from_dict(d) for d in json.load(f)]
+        except (OSError, ValueError, KeyError, TypeError, re.error):
+            return  # A damaged cache only costs re-detection
+        for plan in plans[-self.max_plans:]:
+            self._plans[plan.fingerprint] = plan
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([plan.to_dict() for plan in self._plans.values()], f)
+        os.replace(tmp, self.path)
+
+
+_registry: TemplateRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> TemplateRegistry:
+    """Process-wide registry, created from the environment on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry(
+                max_plans=int(os.getenv("TEMPLATE_CACHE_SIZE", "256")),
+                path=os.getenv("TEMPLATE_CACHE_PATH") or None,
+            )
+        return _registry
@@ -0,0 +1,94 @@
+"""Regression tests for student-detail extraction around the course table."""
+import pytest
+
+pytest.importorskip("pdfplumber")
+canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+
+from src.pagecache import PageCache  # noqa: E402
+from src.parser import parse_transcript  # noqa: E402
+from src.templates import TemplateRegistry  # noqa: E402
+
+DETAILS = [
+    "NAME: ADA OBI",
+    "MATRIC NO: 170805001",
+    "FACULTY: SCIENCE",
+    "DEPARTMENT: COMPUTER SCIENCE",
+    "SEX: F",
+    "DATE OF BIRTH: 1999",
+]
+AWARD = "YEAR OF AWARD: 2021"
+
+
+def _lines(c, lines, y=800):
+    for text in lines:
+        c.drawString(50, y, text)
+        y -= 16
+    return y
+
+
+def _make_pdf(path, cover=False, award_page=False, years=2):
+    """Course table pages, with details on a cover page or around the table."""
+    c = canvas.Canvas(str(path), pagesize=(595, 842))
+    if cover:
+        _lines(c, ["UNIVERSITY OF LAGOS", "ACADEMIC TRANSCRIPT", *DETAILS])
+        c.showPage()
+    for year in range(1, years + 1):
+        y = 800
+        if year == 1 and not cover:
+            y = _lines(c, ["UNIVERSITY OF LAGOS", *DETAILS])
+        c.drawString(50, y, f"SESSION: {2016 + year}/{2017 + year}  YEAR: {year}")
+        y -= 16
+        for i in range(8):
+            c.drawString(50, y, f"CSC{year}{i:02d}")
+            c.drawString(120, y, f"Topic {i}")
+            c.drawString(400, y, "3")
+            c.drawString(450, y, "B")
+            c.drawString(500, y, "4.0")
+            y -= 16
+        if year == years and not award_page:
+            c.drawString(50, y - 30, AWARD)
+        c.showPage()
+    if award_page:
+        _lines(c, ["CERTIFIED TRUE COPY", AWARD])
+        c.showPage()
+    c.save()
+    return path
+
+
+def _parse(path):
+    return parse_transcript(str(path), registry=TemplateRegistry(), page_cache=PageCache())
+
+
+def _expected():
+    return {
+        "Name": "ADA OBI", "Matric_No": "170805001", "Faculty": "SCIENCE",
+        "Department": "COMPUTER SCIENCE", "Sex": "F", "DOB": "1999", "Year_of_Award": "2021",
+    }
+
+
+def test_details_around_table(tmp_path):
+    df, info = _parse(_make_pdf(tmp_path / "plain.pdf"))
+    assert info == _expected()
+    assert len(df) == 16
+
+
+def test_details_on_cover_page(tmp_path):
+    df, info = _parse(_make_pdf(tmp_path / "cover.pdf", cover=True))
+    assert info == _expected()
+    assert len(df) == 16
+    assert set(df["Name"]) == {"ADA OBI"}
+    assert set(df["Matric_No"]) == {"170805001"}
+
+
+def test_award_on_trailing_page(tmp_path):
+    _, info = _parse(_make_pdf(tmp_path / "award.pdf", award_page=True))
+    assert info == _expected()
+
+
+def test_cached_plan_keeps_cover_page_details(tmp_path):
+    registry, page_cache = TemplateRegistry(), PageCache()
+    path = _make_pdf(tmp_path / "cover.pdf", cover=True)
+    parse_transcript(str(path), registry=registry, page_cache=page_cache)
+    _, info = parse_transcript(str(path), registry=registry, page_cache=page_cache)
+    assert registry.hits == 1
+    assert info == _expected()
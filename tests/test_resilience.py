@@ -0,0 +1,134 @@
+"""Deadline, retry, hedge and circuit-breaker behaviour of ResilientBackend."""
+import threading
+import time
+
+import pytest
+
+from src.backends import BackendError, FakeBackend, LLMBackend
+from src.resilience import CallPolicy, CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResilientBackend
+
+
+class FlakyBackend(LLMBackend):
+    """Fails the first `failures` calls, then answers."""
+
+    name = "flaky"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def chat(self, prompt, temperature=0.7, response_format=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise BackendError("flaky")
+        return "ok"
+
+
+class StallingStream(LLMBackend):
+    """Sends one chunk, then hangs until released."""
+
+    name = "stalling"
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def chat(self, prompt, temperature=0.7, response_format=None):
+        return "ok"
+
+    def stream(self, prompt, temperature=0.7):
+        yield "first "
+        self.released.wait(10)
+        yield "late"
+
+
+def _fake(**kwargs):
+    return FakeBackend(latency="fixed", **kwargs)
+
+
+def test_chat_deadline():
+    backend = ResilientBackend(_fake(latency_ms=600), CallPolicy(timeout_s=0.1, retries=0))
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        backend.chat("prompt")
+    assert time.monotonic() - start < 0.5
+
+
+def test_stream_deadline_while_waiting_for_chunk():
+    inner = StallingStream()
+    backend = ResilientBackend(inner, CallPolicy(timeout_s=0.2))
+    chunks = backend.stream("prompt")
+    assert next(chunks) == "first "
+    start = time.monotonic()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            next(chunks)
+        assert time.monotonic() - start < 0.5
+    finally:
+        inner.released.set()
+
+
+def test_stream_yields_all_chunks():
+    inner = _fake(latency_ms=5, chunk_words=3)
+    backend = ResilientBackend(inner, CallPolicy(timeout_s=5))
+    assert "".join(backend.stream("prompt")).strip() == inner.render("prompt")
+
+
+def test_retry_recovers_from_one_failure():
+    inner = FlakyBackend(failures=1)
+    backend = ResilientBackend(inner, CallPolicy(retries=1, retry_backoff_s=0))
+    assert backend.chat("prompt") == "ok"
+    assert inner.calls == 2
+
+
+def test_retries_exhausted():
+    inner = _fake(latency_ms=1, error_rate=1.0)
+    backend = ResilientBackend(inner, CallPolicy(retries=2, retry_backoff_s=0))
+    with pytest.raises(BackendError):
+        backend.chat("prompt")
+    assert inner.calls == 3
+
+
+def test_no_hedge_until_quantile_known():
+    backend = ResilientBackend(_fake(latency_ms=100), CallPolicy(hedge=True, hedge_min_s=0.01))
+    backend.chat("prompt")
+    assert backend.hedges_sent == 0
+
+    for _ in range(20):
+        backend.histogram("other").record(0.01)
+    backend.chat("prompt")
+    assert backend.hedges_sent == 1
+
+
+def test_breaker_opens_and_trial_closes_it():
+    breaker = CircuitBreaker(error_rate=0.5, window=4, min_calls=4, cooldown_s=0.05)
+    inner = FlakyBackend(failures=4)
+    backend = ResilientBackend(inner, CallPolicy(retries=0), breaker)
+    for _ in range(4):
+        with pytest.raises(BackendError):
+            backend.chat("prompt")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        backend.chat("prompt")
+    assert inner.calls == 4
+
+    time.sleep(0.06)
+    assert backend.chat("prompt") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_late_result_does_not_decide_trial():
+    breaker = CircuitBreaker(error_rate=0.5, window=2, min_calls=2, cooldown_s=0.05)
+    early = breaker.allow()
+    for _ in range(2):
+        breaker.record(False, breaker.allow())
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    trial = breaker.allow()
+    assert trial
+    breaker.record(True, early)  # Admitted before the circuit opened
+    assert breaker.state == "half_open"
+    assert breaker.allow() is None  # The trial is still in flight
+
+    breaker.record(False, trial)
+    assert breaker.state == "open"